@@ -1,3 +1,14 @@
 from django.contrib import admin
 
-# Register your models here.
+from . import models
+
+
+@admin.register(models.QueuedEmail)
+class QueuedEmailAdmin(admin.ModelAdmin):
+    list_display = ['id', 'to', 'subject', 'status', 'attempts',
+                    'created_at', 'next_attempt_at', 'sent_at']
+    list_filter = ['status']
+    list_per_page = 20
+    ordering = ['-id']
+    readonly_fields = ['created_at', 'sent_at', 'last_error']
+    search_fields = ['to']
@@ -0,0 +1,181 @@
+"""
+OTP storage backends.
+
+The backend is selected by the OTP_STORAGE_BACKEND setting:
+- otp.backends.DatabaseOTPBackend keeps the codes in the OTP database table.
+- otp.backends.CacheOTPBackend keeps the codes in Django's cache framework,
+  and relies on the cache expiry instead of the expires_at column.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, get_random_string
+from django.utils.module_loading import import_string
+
+from .models import OTP
+
+
+def get_otp_backend():
+    """
+    Returns an instance of the configured OTP storage backend.
+    """
+    return import_string(settings.OTP_STORAGE_BACKEND)()
+
+
+class BaseOTPBackend():
+    """
+    The interface of the OTP storage backends.
+    """
+
+    def generate(self, instance) -> str:
+        """
+        Returns the active OTP of the given instance, or a new one when there is none.
+        """
+        raise NotImplementedError
+
+    def verify(self, instance, otp: str) -> bool:
+        """
+        Checks the OTP of the given instance and consumes it on success.
+        The OTP is dropped after too many wrong guesses.
+        """
+        raise NotImplementedError
+
+    def new_otp(self) -> str:
+        return get_random_string(6, allowed_chars='0123456789')
+
+
+class DatabaseOTPBackend(BaseOTPBackend):
+    """
+    Stores the OTPs in the OTP database table.
+    """
+
+    def get_active_otp(self, instance):
+        return OTP.objects.get(
+            content_type=ContentType.objects.get_for_model(instance.__class__),
+            object_id=instance.pk,
+            expires_at__gt=timezone.now(),
+        )
+
+    def generate(self, instance) -> str:
+        content_type = ContentType.objects.get_for_model(instance.__class__)
+
+        # There's at most one OTP row per instance (see the OTP's unique constraint).
+        # Losing a race to a concurrent request means its OTP is the active one,
+        # so the lookup is simply repeated.
+        for _ in range(3):
+            now = timezone.now()
+            otp_obj = OTP.objects \
+                .filter(content_type=content_type, object_id=instance.pk) \
+                .first()
+
+            # Prevent duplicate OTP requests before the current OTP expiration.
+            if otp_obj and otp_obj.expires_at > now:
+                return otp_obj.otp
+
+            otp = self.new_otp()
+            values = {
+                'otp': otp,
+                'attempts': 0,
+                'created_at': now,
+                'expires_at': now + timedelta(seconds=settings.OTP_LIFETIME),
+            }
+
+            if otp_obj:
+                # Replace the expired OTP, unless a concurrent request already did.
+                if OTP.objects.filter(pk=otp_obj.pk, expires_at__lte=now).update(**values):
+                    return otp
+                continue
+
+            try:
+                with transaction.atomic():
+                    OTP.objects.create(
+                        content_type=content_type, object_id=instance.pk, **values)
+                return otp
+            except IntegrityError:
+                continue
+
+        return self.get_active_otp(instance).otp
+
+    def verify(self, instance, otp: str) -> bool:
+        try:
+            otp_obj = self.get_active_otp(instance)
+        except OTP.DoesNotExist:
+            return False
+
+        if constant_time_compare(otp_obj.otp, otp):
+            # Remove the OTP object after validation success.
+            otp_obj.delete()
+            return True
+
+        if otp_obj.attempts + 1 >= settings.OTP_MAX_ATTEMPTS:
+            otp_obj.delete()
+        else:
+            OTP.objects.filter(pk=otp_obj.pk).update(attempts=F('attempts') + 1)
+
+        return False
+
+
+class CacheOTPBackend(BaseOTPBackend):
+    """
+    Stores the OTPs in the cache configured by the OTP_CACHE_ALIAS setting.
+    The cache must be shared between the processes (e.g. Redis or Memcached)
+    when there's more than one application worker.
+    """
+
+    @property
+    def cache(self):
+        return caches[settings.OTP_CACHE_ALIAS]
+
+    def get_keys(self, instance):
+        key = f"otp:{instance._meta.label_lower}:{instance.pk}"
+        return key, f"{key}:attempts"
+
+    def generate(self, instance) -> str:
+        key, attempts_key = self.get_keys(instance)
+
+        # add() only stores the new OTP when there isn't an active one,
+        # which prevents duplicate OTP requests before the current OTP expiration.
+        # The active OTP may expire (or be consumed) before it's read,
+        # so the addition is simply repeated.
+        for _ in range(3):
+            otp = self.new_otp()
+            if self.cache.add(key, otp, timeout=settings.OTP_LIFETIME):
+                self.cache.set(attempts_key, 0, timeout=settings.OTP_LIFETIME)
+                return otp
+
+            active_otp = self.cache.get(key)
+            if active_otp is not None:
+                return active_otp
+
+        raise OTP.DoesNotExist('The active OTP kept disappearing from the cache.')
+
+    def verify(self, instance, otp: str) -> bool:
+        key, attempts_key = self.get_keys(instance)
+        active_otp = self.cache.get(key)
+        if active_otp is None:
+            return False
+
+        if constant_time_compare(active_otp, otp):
+            # Only the request which removes the OTP consumes it,
+            # a concurrent verification of the same OTP fails.
+            if not self.cache.delete(key):
+                return False
+            self.cache.delete(attempts_key)
+            return True
+
+        try:
+            attempts = self.cache.incr(attempts_key)
+        except ValueError:
+            # The counter was evicted, count this attempt from scratch.
+            attempts = 1
+            self.cache.set(attempts_key, attempts, timeout=settings.OTP_LIFETIME)
+
+        if attempts >= settings.OTP_MAX_ATTEMPTS:
+            self.cache.delete_many([key, attempts_key])
+
+        return False
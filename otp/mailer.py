@@ -0,0 +1,135 @@
+"""
+A background mail sender for the OTP emails.
+
+The views only store the rendered email in the database,
+and the send_otp_emails management command delivers the queued emails
+in batches over a single SMTP connection.
+"""
+from datetime import timedelta
+from smtplib import SMTPException
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import QueuedEmail
+
+
+def enqueue_email(subject: str, body: str, to: str, html_body: str = '',
+                  from_email: str = None) -> QueuedEmail:
+    """
+    Store an email in the queue.
+    """
+    return QueuedEmail.objects.create(
+        subject=subject,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=to,
+        body=body,
+        html_body=html_body,
+    )
+
+
+def queue_age() -> float:
+    """
+    The age of the oldest pending email in seconds, or zero when the queue is empty.
+    """
+    oldest = QueuedEmail.objects \
+        .filter(status=QueuedEmail.STATUS_PENDING) \
+        .order_by('created_at') \
+        .values_list('created_at', flat=True) \
+        .first()
+    if oldest is None:
+        return 0.0
+    return (timezone.now() - oldest).total_seconds()
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """
+    Exponential backoff delay for the given number of failed attempts.
+    """
+    return timedelta(seconds=settings.OTP_EMAIL_RETRY_DELAY * (2 ** max(attempts - 1, 0)))
+
+
+def claim_batch(batch_size: int) -> list:
+    """
+    Claim a batch of the due pending emails.
+    The claimed rows are leased by pushing their next attempt forward,
+    so other senders skip them while this one is talking to the mail server.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            QueuedEmail.objects
+            .select_for_update(skip_locked=True)
+            .filter(
+                status=QueuedEmail.STATUS_PENDING,
+                next_attempt_at__lte=now,
+            )
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        QueuedEmail.objects.filter(pk__in=[e.pk for e in batch]).update(
+            next_attempt_at=now + timedelta(seconds=settings.OTP_EMAIL_LEASE_TIME)
+        )
+    return batch
+
+
+def build_message(queued_email: QueuedEmail, connection) -> EmailMultiAlternatives:
+    # https://docs.djangoproject.com/en/5.0/topics/email/#django.core.mail.EmailMessage
+    email = EmailMultiAlternatives(
+        queued_email.subject,
+        queued_email.body,
+        queued_email.from_email,
+        [queued_email.to],
+        connection=connection,
+    )
+    if queued_email.html_body:
+        email.attach_alternative(queued_email.html_body, 'text/html')
+    return email
+
+
+def process_email_queue(batch_size: int = None) -> dict:
+    """
+    Send a single batch of the due pending emails over one SMTP connection.
+    Returns the number of the sent, retried and failed emails.
+    """
+    batch = claim_batch(batch_size or settings.OTP_EMAIL_BATCH_SIZE)
+    result = {'sent': 0, 'retried': 0, 'failed': 0}
+    if not batch:
+        return result
+
+    connection = get_connection()
+    try:
+        for queued_email in batch:
+            queued_email.attempts += 1
+            try:
+                # Keep the connection open between emails, it's a no-op once opened.
+                connection.open()
+                build_message(queued_email, connection).send()
+            except (SMTPException, OSError) as e:
+                # https://docs.python.org/3/library/smtplib.html#smtplib.SMTPException
+                queued_email.last_error = str(e) or e.__class__.__name__
+                if queued_email.attempts >= settings.OTP_EMAIL_MAX_ATTEMPTS:
+                    queued_email.status = QueuedEmail.STATUS_FAILED
+                    result['failed'] += 1
+                else:
+                    queued_email.next_attempt_at = timezone.now() \
+                        + retry_delay(queued_email.attempts)
+                    result['retried'] += 1
+                # The connection may be broken, the next email opens a new one.
+                connection.close()
+                continue
+
+            queued_email.status = QueuedEmail.STATUS_SENT
+            queued_email.sent_at = timezone.now()
+            queued_email.last_error = ''
+            result['sent'] += 1
+    finally:
+        connection.close()
+
+        QueuedEmail.objects.bulk_update(
+            batch,
+            ['status', 'attempts', 'last_error', 'next_attempt_at', 'sent_at']
+        )
+
+    return result
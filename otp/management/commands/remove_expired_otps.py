@@ -1,14 +1,52 @@
+import logging
+import time
+
+from django.conf import settings
 from django.core.management.base import BaseCommand
-from django.utils import timezone
+from django.db import DatabaseError, close_old_connections
+
+from otp.reaper import remove_expired_otps
+
 
-from otp.models import OTP
+logger = logging.getLogger(__name__)
 
 
 class Command(BaseCommand):
     help = 'Remove expired OTPs from the database'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.OTP_REAPER_BATCH_SIZE,
+            help='Maximum number of OTPs to delete per statement.')
+        parser.add_argument(
+            '--pause', type=float, default=settings.OTP_REAPER_PAUSE,
+            help='Seconds to sleep between the batches.')
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep removing the expired OTPs periodically instead of exiting.')
+        parser.add_argument(
+            '--interval', type=float, default=settings.OTP_REAPER_INTERVAL,
+            help='Seconds to sleep between the runs.')
+
     def handle(self, *args, **options):
-        expired_otps = OTP.objects.filter(expires_at__lt=timezone.now())
-        num_deleted, _ = expired_otps.delete()
-        self.stdout.write(self.style.SUCCESS(
-            f'Removed {num_deleted} expired OTPs from the database.'))
+        while True:
+            try:
+                num_deleted, duration = remove_expired_otps(
+                    batch_size=options['batch_size'],
+                    pause=options['pause'],
+                )
+            except DatabaseError:
+                if not options['loop']:
+                    raise
+                # A failed run is retried on the next interval.
+                logger.exception('Removing the expired OTPs failed.')
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Removed {num_deleted} expired OTPs from the database in {duration:.2f}s.'))
+
+            if not options['loop']:
+                break
+
+            # The connection may be broken, the next run opens a new one.
+            close_old_connections()
+            time.sleep(options['interval'])
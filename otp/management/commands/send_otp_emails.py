@@ -0,0 +1,52 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+
+from otp.mailer import process_email_queue, queue_age
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Send the queued OTP emails'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.OTP_EMAIL_BATCH_SIZE,
+            help='Maximum number of emails to send over a single connection.')
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep sending the queued emails instead of exiting once the queue is empty.')
+        parser.add_argument(
+            '--interval', type=float, default=settings.OTP_EMAIL_POLL_INTERVAL,
+            help='Seconds to sleep between the polls when the queue is empty.')
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                # The age of the oldest pending email, measured before the batch is sent.
+                age = queue_age()
+                result = process_email_queue(batch_size=options['batch_size'])
+            except DatabaseError:
+                if not options['loop']:
+                    raise
+                # A failed poll is retried on the next interval.
+                logger.exception('Sending the queued OTP emails failed.')
+            else:
+                if sum(result.values()):
+                    self.stdout.write(self.style.SUCCESS(
+                        f"Sent {result['sent']}, retrying {result['retried']}, "
+                        f"failed {result['failed']} emails. Queue age: {age:.1f}s."))
+                    # Keep going while there might be more due emails.
+                    continue
+
+            if not options['loop']:
+                break
+
+            # The connection may be broken, the next poll opens a new one.
+            close_old_connections()
+            time.sleep(options['interval'])
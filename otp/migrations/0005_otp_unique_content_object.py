@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:08
+
+from django.db import migrations, models
+
+
+def remove_duplicate_otps(apps, schema_editor):
+    """Keep only the latest OTP of every object before adding the unique constraint."""
+    OTP = apps.get_model('otp', 'OTP')
+    latest_ids = OTP.objects.values('content_type_id', 'object_id') \
+        .annotate(latest_id=models.Max('id')) \
+        .values_list('latest_id', flat=True)
+    OTP.objects.exclude(id__in=list(latest_ids)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('otp', '0004_otp_expires_at_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_otps, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='otp',
+            constraint=models.UniqueConstraint(fields=('content_type', 'object_id'), name='otp_unique_content_object'),
+        ),
+    ]
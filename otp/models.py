@@ -1,6 +1,7 @@
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.db import models
+from django.utils import timezone
 
 
 class OTP(models.Model):
@@ -11,8 +12,60 @@ class OTP(models.Model):
     object_id = models.PositiveIntegerField()
     content_object = GenericForeignKey('content_type', 'object_id')
     otp = models.CharField(max_length=6)
+    # The number of wrong guesses, the OTP is dropped after OTP_MAX_ATTEMPTS.
+    attempts = models.PositiveSmallIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     expires_at = models.DateTimeField()
 
     def __str__(self):
         return f"OTP for {self.content_object}"
+
+    class Meta:
+        constraints = [
+            # A single OTP row per object. The expired one is replaced on the next request.
+            # It's also the index used by the OTP lookups.
+            models.UniqueConstraint(
+                fields=['content_type', 'object_id'], name='otp_unique_content_object'),
+        ]
+        indexes = [
+            # Used by the expired OTPs reaper.
+            models.Index(fields=['expires_at']),
+        ]
+
+
+class QueuedEmail(models.Model):
+    """
+    Represents an email waiting to be sent by the background mail sender.
+    """
+    STATUS_PENDING = 'P'
+    STATUS_SENT = 'S'
+    STATUS_FAILED = 'F'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    from_email = models.CharField(max_length=255, blank=True, default='')
+    to = models.EmailField()
+    body = models.TextField()
+    html_body = models.TextField(blank=True, default='')
+    status = models.CharField(
+        max_length=1, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Email to {self.to} ({self.get_status_display()})"
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            # The sender only ever looks for the due pending emails.
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
@@ -0,0 +1,42 @@
+"""
+Removal of the expired OTPs.
+
+The expired rows are deleted in small batches with a pause in between,
+so the deletion never holds long locks on the OTP table.
+"""
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import OTP
+
+
+def remove_expired_otps(batch_size: int = None, pause: float = None) -> tuple:
+    """
+    Delete the expired OTPs batch by batch.
+    Returns the number of the removed rows and the duration in seconds.
+    """
+    batch_size = batch_size or settings.OTP_REAPER_BATCH_SIZE
+    pause = settings.OTP_REAPER_PAUSE if pause is None else pause
+    started_at = time.monotonic()
+    now = timezone.now()
+    removed = 0
+
+    while True:
+        # Deleting by the primary keys keeps every DELETE statement bounded.
+        ids = list(
+            OTP.objects.filter(expires_at__lte=now)
+            .order_by('expires_at')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+
+        removed += OTP.objects.filter(pk__in=ids).delete()[0]
+
+        if len(ids) < batch_size:
+            break
+        time.sleep(pause)
+
+    return removed, time.monotonic() - started_at
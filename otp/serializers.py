@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from rest_framework import serializers
 from rest_framework_simplejwt.tokens import RefreshToken
 
@@ -22,8 +23,10 @@ class CreateUserOTPSerializer(serializers.Serializer):
         user_email = self.validated_data.get('email')
         try:
             user = User.objects.get(email=user_email)
-            otp = otp_utils.generate_otp(user)
-            otp_utils.send_otp_email(instance=user, otp=otp)
+            # The email is queued alongside the OTP, the response doesn't wait for the mail server.
+            with transaction.atomic():
+                otp = otp_utils.generate_otp(user)
+                otp_utils.send_otp_email(instance=user, otp=otp)
             return True
         except User.DoesNotExist:
             return False
@@ -0,0 +1,129 @@
+from unittest import mock
+
+import pytest
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from otp import utils as otp_utils
+from otp.models import OTP
+
+
+User = get_user_model()
+
+
+@pytest.fixture(name='user')
+def fixture_user():
+    """Create and return a User instance."""
+    return User.objects.create_user(username='user', email='user@local.host')
+
+
+@pytest.fixture(name='otp_backend', params=['database', 'cache'])
+def fixture_otp_backend(request, settings):
+    """Run the test against each OTP storage backend."""
+    settings.OTP_STORAGE_BACKEND = {
+        'database': 'otp.backends.DatabaseOTPBackend',
+        'cache': 'otp.backends.CacheOTPBackend',
+    }[request.param]
+    settings.OTP_MAX_ATTEMPTS = 3
+    cache.clear()
+    yield request.param
+    cache.clear()
+
+
+@pytest.mark.django_db
+class TestOTPBackends:
+    """Test the behavior shared by the OTP storage backends."""
+
+    def test_if_active_otp_is_reused(self, otp_backend, user):
+        """Test if requesting another OTP returns the active one."""
+        otp = otp_utils.generate_otp(user)
+
+        assert len(otp) == 6
+        assert otp_utils.generate_otp(user) == otp
+
+    def test_if_otp_is_consumed_after_verification(self, otp_backend, user):
+        """Test if an OTP can only be verified once."""
+        otp = otp_utils.generate_otp(user)
+
+        assert otp_utils.verify_otp(user, otp)
+        assert not otp_utils.verify_otp(user, otp)
+
+    def test_if_otp_is_dropped_after_max_attempts(self, otp_backend, user):
+        """Test if an OTP is dropped after too many wrong guesses."""
+        otp = otp_utils.generate_otp(user)
+        wrong_otp = str((int(otp) + 1) % 1000000).zfill(6)
+
+        for _ in range(3):
+            assert not otp_utils.verify_otp(user, wrong_otp)
+
+        assert not otp_utils.verify_otp(user, otp)
+
+    def test_if_otp_expires(self, otp_backend, settings, user):
+        """Test if an expired OTP cannot be verified."""
+        settings.OTP_LIFETIME = 0
+        otp = otp_utils.generate_otp(user)
+
+        assert not otp_utils.verify_otp(user, otp)
+
+
+@pytest.mark.django_db
+def test_if_cache_backend_does_not_touch_the_database(settings, user,
+                                                      django_assert_num_queries):
+    """Test if the cache backend issues and verifies the OTPs without any query."""
+    settings.OTP_STORAGE_BACKEND = 'otp.backends.CacheOTPBackend'
+    cache.clear()
+
+    with django_assert_num_queries(0):
+        otp = otp_utils.generate_otp(user)
+        assert otp_utils.verify_otp(user, otp)
+
+    assert not OTP.objects.exists()
+
+
+@pytest.mark.django_db
+def test_if_cache_backend_consumes_otp_once(settings, user):
+    """Test if a verification fails when a concurrent one removed the OTP first."""
+    settings.OTP_STORAGE_BACKEND = 'otp.backends.CacheOTPBackend'
+    cache.clear()
+    otp = otp_utils.generate_otp(user)
+    backend = otp_utils.get_otp_backend()
+    key, _ = backend.get_keys(user)
+    get = backend.cache.get
+
+    def concurrent_get(*args, **kwargs):
+        # The concurrent request consumes the OTP right after this one has read it.
+        value = get(*args, **kwargs)
+        backend.cache.delete(key)
+        return value
+
+    with mock.patch.object(backend.cache, 'get', side_effect=concurrent_get):
+        assert not backend.verify(user, otp)
+
+
+@pytest.mark.django_db
+def test_if_cache_backend_gives_up_on_a_vanishing_otp(settings, user):
+    """Test if the OTP generation doesn't retry forever when the active OTP can't be read."""
+    settings.OTP_STORAGE_BACKEND = 'otp.backends.CacheOTPBackend'
+    backend = otp_utils.get_otp_backend()
+
+    with mock.patch.object(backend.cache, 'add', return_value=False) as add, \
+            mock.patch.object(backend.cache, 'get', return_value=None), \
+            pytest.raises(OTP.DoesNotExist):
+        backend.generate(user)
+
+    assert add.call_count == 3
+
+
+@pytest.mark.django_db
+def test_if_database_backend_replaces_expired_otp(settings, user):
+    """Test if a new OTP request reuses the single OTP row of an instance."""
+    settings.OTP_STORAGE_BACKEND = 'otp.backends.DatabaseOTPBackend'
+    settings.OTP_LIFETIME = 0
+    otp_utils.generate_otp(user)
+
+    settings.OTP_LIFETIME = 120
+    otp = otp_utils.generate_otp(user)
+
+    assert OTP.objects.count() == 1
+    assert otp_utils.verify_otp(user, otp)
@@ -0,0 +1,98 @@
+from io import StringIO
+from smtplib import SMTPException
+from unittest import mock
+
+import pytest
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.db import DatabaseError
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from otp.mailer import process_email_queue, queue_age
+from otp.models import QueuedEmail
+
+
+User = get_user_model()
+
+
+@pytest.fixture(name='request_otp')
+def fixture_request_otp():
+    """Perform HTTP POST request on /otp/email/ API endpoint."""
+    def _request_otp(email='user@local.host'):
+        User.objects.get_or_create(
+            username='user', email=email, first_name='John', last_name='Doe')
+        return APIClient().post('/otp/email/', {'email': email}, format='json')
+    return _request_otp
+
+
+@pytest.mark.django_db
+class TestOTPEmailQueue:
+    """Test the OTP emails queue and its background sender."""
+
+    def test_if_otp_request_queues_the_email(self, request_otp):
+        """Test if the OTP request returns without sending the email."""
+        response = request_otp()
+
+        queued_email = QueuedEmail.objects.get()
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(mail.outbox) == 0
+        assert queued_email.status == QueuedEmail.STATUS_PENDING
+        assert queued_email.to == 'user@local.host'
+        assert 'John' in queued_email.html_body
+        assert queue_age() >= 0
+
+    def test_if_sender_sends_the_queued_emails(self, request_otp):
+        """Test if the queued emails are sent and marked as sent."""
+        request_otp()
+
+        result = process_email_queue()
+        queued_email = QueuedEmail.objects.get()
+
+        assert result == {'sent': 1, 'retried': 0, 'failed': 0}
+        assert len(mail.outbox) == 1
+        assert mail.outbox[0].to == ['user@local.host']
+        assert queued_email.status == QueuedEmail.STATUS_SENT
+        assert queue_age() == 0
+
+    def test_if_batch_reuses_a_single_connection(self):
+        """Test if a batch of emails is sent over one connection."""
+        for i in range(3):
+            QueuedEmail.objects.create(subject='OTP', to=f'user{i}@local.host', body='1')
+
+        with mock.patch('otp.mailer.get_connection',
+                        wraps=mail.get_connection) as get_connection:
+            result = process_email_queue()
+
+        assert result['sent'] == 3
+        assert get_connection.call_count == 1
+
+    def test_if_failed_email_is_retried(self):
+        """Test if an SMTP error schedules the email for another attempt."""
+        QueuedEmail.objects.create(subject='OTP', to='user@local.host', body='1')
+
+        with mock.patch('django.core.mail.EmailMultiAlternatives.send',
+                        side_effect=SMTPException('Unavailable')):
+            result = process_email_queue()
+        queued_email = QueuedEmail.objects.get()
+
+        assert result == {'sent': 0, 'retried': 1, 'failed': 0}
+        assert queued_email.status == QueuedEmail.STATUS_PENDING
+        assert queued_email.attempts == 1
+        assert queued_email.last_error == 'Unavailable'
+
+    def test_if_loop_logs_failed_polls(self, caplog):
+        """Test if a failed poll is logged and the loop goes on."""
+        command = 'otp.management.commands.send_otp_emails'
+
+        with mock.patch(f'{command}.queue_age', side_effect=DatabaseError('gone')), \
+                mock.patch(f'{command}.time.sleep', side_effect=[None, InterruptedError]):
+            with pytest.raises(InterruptedError):
+                call_command('send_otp_emails', '--loop', '--interval=0', stdout=StringIO())
+
+        failures = [record for record in caplog.records if record.exc_info]
+        assert len(failures) == 2
+        assert 'gone' in str(failures[0].exc_info[1])
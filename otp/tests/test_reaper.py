@@ -0,0 +1,67 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+import pytest
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.utils import timezone
+
+from otp.models import OTP
+from otp.reaper import remove_expired_otps
+
+
+User = get_user_model()
+
+
+@pytest.fixture(name='create_otps')
+def fixture_create_otps():
+    """Create the given number of expired and active OTPs."""
+    def _create_otps(expired, active=0):
+        now = timezone.now()
+        for i in range(expired + active):
+            # There's a single OTP per user.
+            user = User.objects.create_user(username=f'user{i}', email=f'user{i}@local.host')
+            expires_at = now - timedelta(minutes=1) if i < expired else now + timedelta(minutes=1)
+            OTP.objects.create(content_object=user, otp='123456', expires_at=expires_at)
+    return _create_otps
+
+
+@pytest.mark.django_db
+class TestExpiredOTPsReaper:
+    """Test the removal of the expired OTPs."""
+
+    def test_if_expired_otps_are_removed_in_batches(self, create_otps):
+        """Test if every expired OTP is removed while the active ones are kept."""
+        create_otps(expired=5, active=1)
+
+        removed, duration = remove_expired_otps(batch_size=2, pause=0)
+
+        assert removed == 5
+        assert duration >= 0
+        assert OTP.objects.count() == 1
+
+    def test_if_command_reports_removed_otps(self, create_otps):
+        """Test if the management command reports the number of the removed OTPs."""
+        create_otps(expired=3)
+        out = StringIO()
+
+        call_command('remove_expired_otps', '--batch-size=2', '--pause=0', stdout=out)
+
+        assert 'Removed 3 expired OTPs' in out.getvalue()
+        assert not OTP.objects.exists()
+
+    def test_if_loop_logs_failed_runs(self, caplog):
+        """Test if a failed run is logged and the loop goes on."""
+        command = 'otp.management.commands.remove_expired_otps'
+
+        with mock.patch(f'{command}.remove_expired_otps', side_effect=DatabaseError('gone')), \
+                mock.patch(f'{command}.time.sleep', side_effect=[None, InterruptedError]):
+            with pytest.raises(InterruptedError):
+                call_command('remove_expired_otps', '--loop', '--interval=0', stdout=StringIO())
+
+        failures = [record for record in caplog.records if record.exc_info]
+        assert len(failures) == 2
+        assert 'gone' in str(failures[0].exc_info[1])
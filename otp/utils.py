@@ -1,75 +1,33 @@
-import random
 import re
 
-from datetime import timedelta
-from smtplib import SMTPException
-
-from django.contrib.contenttypes.models import ContentType
-from django.conf import settings
-from django.core.mail import EmailMultiAlternatives
 from django.template.loader import get_template
-from django.utils import timezone
 from django.utils.html import strip_tags
 
-from .models import OTP
+from .backends import get_otp_backend
+from .mailer import enqueue_email
 
 
 def generate_otp(instance):
     """
     Generate a new OTP for the given instance.
+    The active OTP is returned instead, if there is one.
     """
-    try:
-        # Prevent duplicate OTP requests before the current OTP expiration.
-        otp_obj = OTP.objects.get(
-            content_type=ContentType.objects.get_for_model(instance.__class__),
-            object_id=instance.pk,
-            expires_at__gt=timezone.now(),
-        )
-
-        return otp_obj.otp
-    except OTP.DoesNotExist:
-        otp = ''.join(random.choices('0123456789', k=6))
-
-        # TODO: Configurable expire time would be nice to have :)?
-        expires_at = timezone.now() + timedelta(minutes=2)
-
-        OTP.objects.create(
-            content_object=instance,
-            otp=otp,
-            expires_at=expires_at,
-        )
-
-        return otp
+    return get_otp_backend().generate(instance)
 
 
 def verify_otp(instance, otp):
     """
     Verify the OTP for the given instance.
     """
-    try:
-        otp_obj = OTP.objects.get(
-            content_type=ContentType.objects.get_for_model(instance.__class__),
-            object_id=instance.pk,
-            expires_at__gt=timezone.now(),
-        )
-    except OTP.DoesNotExist:
-        return False
-
-    if otp_obj.otp == otp:
-        # Remove the OTP object after validation success.
-        otp_obj.delete()
-
-        return True
-
-    return False
+    return get_otp_backend().verify(instance, otp)
 
 
 def send_otp_email(instance, otp: str):
     """
-    Email the OTP.
+    Queue the OTP email.
+    It's sent in the background by the send_otp_emails management command.
     """
     subject = 'OTP Verification'
-    from_email = settings.DEFAULT_FROM_EMAIL
     to = instance.email
 
     template = get_template('emails/email_template.html')
@@ -83,20 +41,12 @@ def send_otp_email(instance, otp: str):
     # This is useful for the older email clients with no HTML support.
     plain_message = strip_tags_extended(html_message)
 
-    try:
-        # https://docs.djangoproject.com/en/5.0/topics/email/#django.core.mail.EmailMessage
-        email = EmailMultiAlternatives(
-            subject,
-            plain_message,
-            from_email,
-            [to]
-        )
-        email.attach_alternative(html_message, 'text/html')
-        email.send()
-    except SMTPException:
-        # https://docs.python.org/3/library/smtplib.html#smtplib.SMTPException
-        # TODO: Logging.
-        pass
+    return enqueue_email(
+        subject=subject,
+        body=plain_message,
+        to=to,
+        html_body=html_message,
+    )
 
 
 def strip_tags_extended(html):
@@ -104,14 +104,14 @@ class RepairManAdmin(admin.ModelAdmin):
 
 @admin.register(models.Manufacturer)
 class ManufacturerAdmin(admin.ModelAdmin):
-    list_display = ['name']
+    list_display = ['name', 'item_count']
     list_per_page = 20
     search_fields = ['name']
 
 
 @admin.register(models.Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ['title']
+    list_display = ['title', 'item_count']
     list_per_page = 20
     search_fields = ['title']
 
@@ -131,7 +131,7 @@ class ServiceAdmin(admin.ModelAdmin):
     inlines = [ServiceItemInline]
 
     list_display = ['id', 'customer', 'placed_at',
-                    'service_status', 'service_priority']
+                    'service_status', 'service_priority', 'item_count']
 
     list_per_page = 20
 
@@ -0,0 +1,120 @@
+"""
+Repair Ninja cache helpers.
+"""
+import time
+
+from django.core.cache import cache
+
+# Every ReferenceTable of the process, to reset them along with the cache.
+reference_tables = []
+
+
+def service_statistics_key(scope: int) -> str:
+    """The cache key of the service statistics of a scope (see ServiceStatusCounter)."""
+    return f"service-statistics:{scope}"
+
+
+def count_cache_access(name: str, hit: bool) -> None:
+    """
+    Count a hit or a miss of a cached resource.
+    The counters are kept in the cache, so they're shared between the workers.
+    """
+    key = f"cache-counters:{name}:{'hits' if hit else 'misses'}"
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def get_cache_counters(name: str) -> dict:
+    """The hit and miss counters of a cached resource."""
+    hits_key = f"cache-counters:{name}:hits"
+    misses_key = f"cache-counters:{name}:misses"
+    values = cache.get_many([hits_key, misses_key])
+    return {
+        'hits': values.get(hits_key, 0),
+        'misses': values.get(misses_key, 0),
+    }
+
+
+def get_cache_version(name: str) -> int:
+    """
+    The current version of a group of cache keys.
+    Bumping the version invalidates all of the keys built with the previous one.
+    """
+    key = f"cache-version:{name}"
+    version = cache.get(key)
+    if version is None:
+        # A missing (e.g. evicted) version is seeded with a value that never repeats,
+        # so the keys of an earlier version can't be served again.
+        seed = time.time_ns()
+        cache.add(key, seed, timeout=None)
+        version = cache.get(key, seed)
+    return version
+
+
+def bump_cache_version(name: str) -> None:
+    """Invalidate a group of cache keys by moving it to the next version."""
+    key = f"cache-version:{name}"
+    try:
+        cache.incr(key)
+    except ValueError:
+        # A new seed is a new version too, unless a concurrent writer added one first.
+        if not cache.add(key, time.time_ns(), timeout=None):
+            cache.incr(key)
+
+
+class ReferenceTable:
+    """
+    An in-process map of a small model's objects by their ids, e.g. the categories.
+    Every worker keeps its own copy, and reloads it when the model's cache version
+    is moved by another worker (see the Category and Manufacturer signal receivers).
+    The version is only seen by the other workers through a shared cache, e.g. Redis.
+    """
+
+    def __init__(self, model, serializer_class):
+        self.model = model
+        self.serializer_class = serializer_class
+        self.version = None
+        self.table = {}
+        reference_tables.append(self)
+
+    def __deepcopy__(self, memo):
+        # The serializer fields are deep-copied per serializer, the table must stay shared.
+        return self
+
+    def load(self, version) -> dict:
+        self.table = {
+            obj.pk: dict(self.serializer_class(obj).data)
+            for obj in self.model.objects.all()
+        }
+        self.version = version
+        return self.table
+
+    def get_table(self) -> dict:
+        """The objects of the current version, reloaded only when the version has moved."""
+        version = get_cache_version(self.model._meta.label_lower)
+        if version != self.version:
+            return self.load(version)
+        return self.table
+
+    def get(self, pk):
+        """
+        The serialized object of the given id, or None if there's no such object.
+        An unknown id reloads the table, the new object may not be announced yet.
+        """
+        table = self.get_table()
+        if pk not in table:
+            table = self.load(self.version)
+        return table.get(pk)
+
+    def reset(self) -> None:
+        self.version = None
+        self.table = {}
+
+
+def reset_reference_tables() -> None:
+    """Forget the in-process reference tables, e.g. after clearing the cache."""
+    for reference_table in reference_tables:
+        reference_table.reset()
@@ -0,0 +1,106 @@
+"""
+Repair Ninja filter backends.
+"""
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import FloatField, Func, Q, Value
+from django.db.models.lookups import GreaterThan
+from rest_framework.filters import SearchFilter
+
+from .utils import normalize_phone
+
+# The terms made of the digits and the phone separators, e.g. '+98912' or '123-4567'.
+PHONE_TERM = re.compile(r'^\+?[\d\-]+$')
+# MySQL splits the indexed words on everything but the letters, the digits and the underscore,
+# including the boolean mode operators and the '.' and '@' of the emails.
+FULLTEXT_DELIMITERS = re.compile(r'\W+')
+
+
+class FullTextMatch(Func):
+    """
+    MySQL's MATCH ... AGAINST in boolean mode, e.g. FullTextMatch('search_document', '+john*').
+    It's only built by FullTextSearchFilter on MySQL, the column must have a FULLTEXT index.
+    """
+    output_field = FloatField()
+
+    def __init__(self, expression, query: str):
+        super().__init__(expression, Value(query))
+
+    def as_sql(self, compiler, connection, **extra_context):
+        column, query = self.get_source_expressions()
+        column_sql, column_params = compiler.compile(column)
+        query_sql, query_params = compiler.compile(query)
+        return f'MATCH ({column_sql}) AGAINST ({query_sql} IN BOOLEAN MODE)', \
+            (*column_params, *query_params)
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    Searches the denormalized search document of the model, instead of the search fields.
+    Keeps the ?search= contract: every term must appear in one of the searched values.
+
+    The phone-like terms are looked up in the normalized phone numbers,
+    or as they're typed in the other values (e.g. a username with digits).
+    On MySQL, the other terms are matched either as word prefixes by the FULLTEXT index
+    or by a LIKE query (e.g. the middle of an email), so a row never depends on the others.
+    The terms shorter than the indexed tokens and the other databases only use a LIKE query.
+    """
+    search_document_field = 'search_document'
+    search_phone_field = 'phone_normalized'
+
+    def split_search_terms(self, search_terms, fulltext: bool) -> tuple:
+        """
+        Splits the terms to the (term, phone digits) pairs, the FULLTEXT terms and the LIKE terms.
+        """
+        phone_terms, fulltext_terms, like_terms = [], [], []
+        for term in search_terms:
+            term = term.lower()
+            if PHONE_TERM.match(term) and normalize_phone(term):
+                phone_terms.append((term, normalize_phone(term)))
+                continue
+            words = FULLTEXT_DELIMITERS.sub(' ', term).split()
+            if fulltext and words \
+                    and all(len(word) >= settings.SEARCH_FULLTEXT_MIN_TOKEN_SIZE for word in words):
+                fulltext_terms.append(term)
+            else:
+                like_terms.append(term)
+        return phone_terms, fulltext_terms, like_terms
+
+    def get_fulltext_query(self, fulltext_terms) -> str:
+        """The boolean mode query which requires a word starting with every word of the terms."""
+        return ' '.join(
+            f'+{word}*'
+            for term in fulltext_terms for word in FULLTEXT_DELIMITERS.sub(' ', term).split()
+        )
+
+    def filter_like(self, queryset, like_terms):
+        for term in like_terms:
+            queryset = queryset.filter(**{f'{self.search_document_field}__contains': term})
+        return queryset
+
+    def filter_queryset(self, request, queryset, view):
+        search_terms = self.get_search_terms(request)
+        if not search_terms:
+            return queryset
+
+        phone_terms, fulltext_terms, like_terms = self.split_search_terms(
+            search_terms, connections[queryset.db].vendor == 'mysql')
+        for term, digits in phone_terms:
+            queryset = queryset.filter(
+                Q(**{f'{self.search_phone_field}__contains': digits})
+                | Q(**{f'{self.search_document_field}__contains': term})
+            )
+        queryset = self.filter_like(queryset, like_terms)
+
+        for term in fulltext_terms:
+            # The index only finds the word prefixes, a term may be in the middle of a word.
+            # The relevance of a non-matching row is zero.
+            queryset = queryset.filter(
+                Q(GreaterThan(
+                    FullTextMatch(self.search_document_field, self.get_fulltext_query([term])), 0
+                ))
+                | Q(**{f'{self.search_document_field}__contains': term})
+            )
+        return queryset
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from repair_core.caching import get_cache_counters
+
+
+class Command(BaseCommand):
+    help = 'Show the hit and miss counters of the cached resources'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names', nargs='*',
+            default=['service-statistics', 'responses:repair_core.category',
+                     'responses:repair_core.manufacturer'],
+            help='The names of the cached resources.'
+        )
+
+    def handle(self, *args, **options):
+        for name in options['names']:
+            counters = get_cache_counters(name)
+            total = counters['hits'] + counters['misses']
+            ratio = counters['hits'] / total if total else 0
+            self.stdout.write(
+                f"{name}: {counters['hits']} hits, {counters['misses']} misses "
+                f"({ratio:.1%} hit ratio)"
+            )
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from repair_core.models import Service, ServiceStatusCounter
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the service status counters from the services table'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            # The writers update the counters in the same transactions as the services,
+            # so once the counters are locked, the counted services can't change under them.
+            list(ServiceStatusCounter.objects.select_for_update().values_list('pk', flat=True))
+
+            rows = Service.objects.order_by() \
+                .values('customer_id', 'service_status') \
+                .annotate(status_count=Count('id'))
+
+            counters = {}
+            for row in rows:
+                for scope in (ServiceStatusCounter.GLOBAL_SCOPE, row['customer_id']):
+                    key = (scope, row['service_status'])
+                    counters[key] = counters.get(key, 0) + row['status_count']
+
+            ServiceStatusCounter.objects.all().delete()
+            ServiceStatusCounter.objects.bulk_create(
+                ServiceStatusCounter(scope=scope, service_status=service_status, count=count)
+                for (scope, service_status), count in counters.items()
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {len(counters)} service status counters.'))
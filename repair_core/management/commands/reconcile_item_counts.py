@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from repair_core.models import ServiceItem
+
+
+class Command(BaseCommand):
+    help = 'Reconcile the item counters of the categories, manufacturers and services'
+
+    def handle(self, *args, **options):
+        for field, model in ServiceItem.COUNTED_RELATIONS.items():
+            relation = field.removesuffix('_id')
+            counts = ServiceItem.objects.filter(**{relation: OuterRef('pk')}).order_by() \
+                .values(relation).annotate(actual_count=Count('pk')).values('actual_count')
+
+            # Only the drifted counters are rewritten.
+            actual_count = Coalesce(Subquery(counts), 0)
+            fixed = model.objects.order_by() \
+                .exclude(item_count=actual_count) \
+                .update(item_count=actual_count)
+
+            self.stdout.write(self.style.SUCCESS(
+                f'Fixed {fixed} {model.__name__} item counter(s).'))
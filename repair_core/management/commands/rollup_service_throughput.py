@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from repair_core.rollups import rollup_service_throughput
+
+
+class Command(BaseCommand):
+    help = 'Add the service changes since the last run to the daily throughput rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lag', type=float, default=60,
+            help='Seconds of the most recent changes to leave for the next run.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Number of services to fetch from the database at once.')
+
+    def handle(self, *args, **options):
+        processed, watermark = rollup_service_throughput(
+            lag=options['lag'],
+            chunk_size=options['chunk_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {processed} services, the rollups are up to date until {watermark}.'))
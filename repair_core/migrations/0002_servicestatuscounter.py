@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:09
+
+from django.db import migrations, models
+
+
+def build_service_counters(apps, schema_editor):
+    """Count the existing services, the same way as the rebuild_service_counters command."""
+    Service = apps.get_model('repair_core', 'Service')
+    ServiceStatusCounter = apps.get_model('repair_core', 'ServiceStatusCounter')
+    rows = Service.objects.order_by() \
+        .values('customer_id', 'service_status') \
+        .annotate(status_count=models.Count('id'))
+
+    counters = {}
+    for row in rows:
+        for scope in (0, row['customer_id']):
+            key = (scope, row['service_status'])
+            counters[key] = counters.get(key, 0) + row['status_count']
+
+    ServiceStatusCounter.objects.bulk_create(
+        ServiceStatusCounter(scope=scope, service_status=service_status, count=count)
+        for (scope, service_status), count in counters.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repair_core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServiceStatusCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.PositiveBigIntegerField()),
+                ('service_status', models.CharField(choices=[('R', 'Received'), ('I', 'In Progress'), ('C', 'Completed'), ('D', 'Delivered')], max_length=1)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('scope', 'service_status'), name='service_status_counter_unique_scope')],
+            },
+        ),
+        migrations.RunPython(build_service_counters, migrations.RunPython.noop),
+    ]
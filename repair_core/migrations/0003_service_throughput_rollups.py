@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:11
+
+from django.db import migrations, models
+
+
+def stamp_existing_services(apps, schema_editor):
+    """The transition times of the existing services are unknown, the last update is the best guess."""
+    Service = apps.get_model('repair_core', 'Service')
+    Service.objects.filter(service_status__in=['C', 'D']) \
+        .update(completed_at=models.F('last_update'))
+    Service.objects.filter(service_status='D') \
+        .update(delivered_at=models.F('last_update'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repair_core', '0002_servicestatuscounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('value', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ServiceThroughputRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('placed', models.IntegerField(default=0)),
+                ('completed', models.IntegerField(default=0)),
+                ('delivered', models.IntegerField(default=0)),
+                ('turnaround_total', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['day'],
+            },
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='delivered_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(stamp_existing_services, migrations.RunPython.noop),
+    ]
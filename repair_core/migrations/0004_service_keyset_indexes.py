@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repair_core', '0003_service_throughput_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['priority', 'id'], name='repair_core_priorit_846fc2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['last_update', 'id'], name='repair_core_last_up_a9cc07_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['placed_at', 'id'], name='repair_core_placed__290ec3_idx'),
+        ),
+    ]
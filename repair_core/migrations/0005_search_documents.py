@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:20
+
+from django.db import migrations, models
+
+# The FULLTEXT indexes are MySQL only, the other databases fall back to LIKE queries.
+FULLTEXT_INDEXES = [
+    ('repair_core_customer', 'repair_core_customer_search_document_ft'),
+    ('repair_core_repairman', 'repair_core_repairman_search_document_ft'),
+]
+
+
+def build_search_documents(apps, schema_editor):
+    """Fill the search documents of the existing customers and repairmen."""
+    for model_name in ['Customer', 'RepairMan']:
+        model = apps.get_model('repair_core', model_name)
+        rows = model.objects.select_related('user').order_by('pk')
+        for row in rows.iterator(chunk_size=2000):
+            values = [row.user.first_name, row.user.last_name,
+                      row.user.username, row.user.email, row.phone]
+            document = ' '.join(value for value in values if value).lower()
+            model.objects.filter(pk=row.pk).update(search_document=document)
+
+
+def create_fulltext_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    for table, index in FULLTEXT_INDEXES:
+        schema_editor.execute(
+            f'CREATE FULLTEXT INDEX {index} ON {table} (search_document)')
+
+
+def drop_fulltext_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    for table, index in FULLTEXT_INDEXES:
+        schema_editor.execute(f'DROP INDEX {index} ON {table}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repair_core', '0004_service_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='repairman',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(build_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_fulltext_indexes, drop_fulltext_indexes),
+    ]
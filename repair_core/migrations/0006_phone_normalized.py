@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:22
+
+from django.db import migrations, models
+
+from repair_core.utils import normalize_phone
+
+
+def normalize_phones(apps, schema_editor):
+    """Fill the normalized phones of the existing customers and repairmen."""
+    for model_name in ['Customer', 'RepairMan']:
+        model = apps.get_model('repair_core', model_name)
+        for pk, phone in model.objects.order_by('pk').values_list('pk', 'phone') \
+                .iterator(chunk_size=2000):
+            model.objects.filter(pk=pk).update(phone_normalized=normalize_phone(phone))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repair_core', '0005_search_documents'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='phone_normalized',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='repairman',
+            name='phone_normalized',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(normalize_phones, migrations.RunPython.noop),
+    ]
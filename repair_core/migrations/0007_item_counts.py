@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:39
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_items(apps, schema_editor):
+    """Fill the item counters of the existing categories, manufacturers and services."""
+    service_item = apps.get_model('repair_core', 'ServiceItem')
+    for model_name, field in [('Category', 'category'), ('Manufacturer', 'manufacturer'),
+                              ('Service', 'service')]:
+        counts = service_item.objects.filter(**{field: OuterRef('pk')}).order_by() \
+            .values(field).annotate(item_count=Count('pk')).values('item_count')
+        apps.get_model('repair_core', model_name).objects \
+            .update(item_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repair_core', '0006_phone_normalized'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='item_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='manufacturer',
+            name='item_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='item_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_items, migrations.RunPython.noop),
+    ]
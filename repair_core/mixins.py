@@ -0,0 +1,396 @@
+"""
+Reusable view and serializer mixins.
+
+Sparse fieldsets for the API endpoints:
+?fields=id,service_status only renders the listed fields.
+?expand=customer only nests the listed relations, the rest are rendered as primary keys.
+The view mixin pushes the rendered fields into only(), select_related() and prefetch_related(),
+so the columns and the joins that are not rendered are not read either.
+"""
+from hashlib import sha1
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Count, Max, Prefetch
+from django.http import Http404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+
+from . import api_exceptions, caching
+from .utils import normalize_phone
+
+FIELDS_QUERY_PARAM = 'fields'
+EXPAND_QUERY_PARAM = 'expand'
+
+
+def get_query_param_list(request, name: str):
+    """
+    A comma separated query parameter as a list, or None if it's not given.
+    """
+    if request is None or name not in request.query_params:
+        return None
+    return [value.strip() for value in request.query_params[name].split(',') if value.strip()]
+
+
+SPARSE_FIELDS_ACTIONS = ['list', 'retrieve']
+
+
+class SparseFieldsSerializerMixin:
+    """
+    Trims the serializer fields by the fields and the expand query parameters.
+    Only the top level serializer is trimmed, the nested ones are left as they are.
+    The fields are only trimmed for the read actions, the input fields are never dropped.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        root = self.root
+        if root is not self and getattr(root, 'child', None) is not self:
+            return fields
+        view = self.context.get('view')
+        if getattr(view, 'action', None) not in \
+                getattr(view, 'sparse_fields_actions', SPARSE_FIELDS_ACTIONS):
+            return fields
+
+        requested = get_query_param_list(request, FIELDS_QUERY_PARAM)
+        if requested is not None:
+            fields = {name: field for name, field in fields.items() if name in requested}
+
+        expand = get_query_param_list(request, EXPAND_QUERY_PARAM)
+        if expand is not None:
+            for name, field in fields.items():
+                if name in expand:
+                    continue
+                # Collapse the nested relations that are not expanded to their primary keys.
+                if isinstance(field, serializers.ListSerializer) \
+                        and isinstance(field.child, serializers.BaseSerializer):
+                    fields[name] = serializers.PrimaryKeyRelatedField(
+                        source=field.source, many=True, read_only=True)
+                elif isinstance(field, serializers.BaseSerializer):
+                    fields[name] = serializers.PrimaryKeyRelatedField(
+                        source=field.source, read_only=True)
+
+        return fields
+
+
+def get_projection(serializer, model, prefix: str = ''):
+    """
+    The only(), select_related() and prefetch_related() arguments of the serializer fields.
+    Returns None when a field can't be mapped to the model fields, e.g. a method field.
+    """
+    only, select_related, prefetch_related = [], [], []
+
+    for field in serializer.fields.values():
+        if field.source == '*' or '.' in field.source:
+            return None
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            return None
+
+        path = prefix + model_field.name
+        nested = field.child if isinstance(field, serializers.ListSerializer) else field
+
+        if model_field.many_to_many or model_field.one_to_many:
+            if isinstance(nested, serializers.BaseSerializer):
+                projection = get_projection(nested, model_field.related_model)
+                if projection is None:
+                    prefetch_related.append(path)
+                    continue
+                queryset = model_field.related_model.objects \
+                    .prefetch_related(*projection[2]) \
+                    .only(*(projection[0] or ['pk']))
+                if projection[1]:
+                    queryset = queryset.select_related(*projection[1])
+                prefetch_related.append(Prefetch(path, queryset=queryset))
+            else:
+                prefetch_related.append(Prefetch(
+                    path, queryset=model_field.related_model.objects.only('pk')))
+        elif model_field.is_relation and isinstance(nested, serializers.BaseSerializer):
+            projection = get_projection(nested, model_field.related_model, f'{path}__')
+            if projection is None:
+                return None
+            select_related.append(path)
+            only.extend(projection[0] or [f'{path}__pk'])
+            select_related.extend(projection[1])
+            prefetch_related.extend(projection[2])
+        elif model_field.is_relation and (model_field.many_to_one or model_field.one_to_one) \
+                and not model_field.concrete:
+            return None
+        else:
+            only.append(path)
+
+    return only, select_related, prefetch_related
+
+
+class SparseFieldsViewMixin:
+    """
+    Reads only the fields that are rendered by a SparseFieldsSerializerMixin serializer.
+    The projection is only applied when the fields or the expand query parameter is given.
+    """
+    sparse_fields_actions = SPARSE_FIELDS_ACTIONS
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action not in self.sparse_fields_actions:
+            return queryset
+        if get_query_param_list(self.request, FIELDS_QUERY_PARAM) is None \
+                and get_query_param_list(self.request, EXPAND_QUERY_PARAM) is None:
+            return queryset
+
+        serializer = self.get_serializer()
+        if not isinstance(serializer, SparseFieldsSerializerMixin):
+            return queryset
+
+        projection = get_projection(serializer, queryset.model)
+        if projection is None:
+            return queryset
+
+        only, select_related, prefetch_related = projection
+        # The relations that are not rendered must not be joined, only() rejects them anyway.
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if select_related:
+            # Without arguments, select_related() would follow every foreign key.
+            queryset = queryset.select_related(*select_related)
+        return queryset \
+            .prefetch_related(*prefetch_related) \
+            .only(*(only or ['pk']))
+
+
+class PhoneAvailabilityMixin:
+    """
+    Checks whether the phone numbers can be used by a new object of the view's model.
+    The phones are compared by their normalized digits (see normalize_phone).
+
+    {"phone": "0912..."} answers with a 200 or a 400 status, as it always did.
+    {"phones": ["0912...", ...]} answers with a map of the phones to their availability,
+    using a single query for all of them.
+    """
+
+    @action(['post'], detail=False)
+    def phone_availability(self, request, *args, **kwargs):
+        if 'phones' in request.data:
+            return Response(
+                self.get_phone_availability(request.data['phones']),
+                status=status.HTTP_200_OK
+            )
+
+        phone = str(request.data.get('phone') or '')
+        # Field cannot be empty.
+        if phone and self.get_phone_availability([phone])[phone]:
+            return Response(status=status.HTTP_200_OK)
+        return Response({'phone': 'This phone number cannot be used.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    def get_phone_availability(self, phones) -> dict:
+        max_phones = settings.PHONE_AVAILABILITY_MAX_PHONES
+        if not isinstance(phones, list) or not all(isinstance(phone, str) for phone in phones):
+            raise api_exceptions.InvalidRequestException('The phones must be a list of strings.')
+        if len(phones) > max_phones:
+            raise api_exceptions.InvalidRequestException(
+                f'At most {max_phones} phones can be checked at once.')
+
+        normalized = {phone: normalize_phone(phone) for phone in phones}
+        used = set(
+            self.queryset.model.objects
+            .filter(phone_normalized__in={digits for digits in normalized.values() if digits})
+            .values_list('phone_normalized', flat=True)
+        ) if phones else set()
+
+        # A phone without any digits can't be used either.
+        return {phone: bool(digits) and digits not in used for phone, digits in normalized.items()}
+
+
+class NestedParentMixin:
+    """
+    Resolves the parent object of a nested route, e.g. the service of /services/{service_pk}/items/.
+
+    The drf-nested-routers don't check the parent, so a missing parent lists as empty.
+    https://github.com/alanjds/drf-nested-routers/issues/216
+    Here, the child queryset is restricted by the parent (and its scope, see get_parent_queryset)
+    in the same query, and the parent is only looked up when that can't tell a 404 apart:
+    an empty list or a creation. The positive lookups are cached until the parent model's
+    cache version is bumped (see the Service post_delete signal receivers).
+    """
+    parent_model = None
+    # The URL keyword argument of the parent's primary key, e.g. 'service_pk'.
+    parent_lookup_kwarg = None
+    # The foreign key of the children to the parent, e.g. 'service'.
+    parent_field = None
+    parent_not_found_message = 'Not found.'
+
+    def get_parent_queryset(self):
+        """The parents which are visible to the current user."""
+        return self.parent_model.objects.all()
+
+    def get_parent_id(self) -> int:
+        try:
+            return int(self.kwargs[self.parent_lookup_kwarg])
+        except ValueError as e:
+            raise api_exceptions.InvalidRequestException(str(e))
+
+    def filter_by_parent(self, queryset):
+        """Restricts the children to the parent, within the same query."""
+        queryset = queryset.filter(**{f'{self.parent_field}_id': self.get_parent_id()})
+        parents = self.get_parent_queryset()
+        if parents.query.where:
+            # The parent's scope is checked by a subquery.
+            queryset = queryset.filter(**{
+                f'{self.parent_field}__in': parents.filter(pk=self.get_parent_id()).values('pk')
+            })
+        return queryset
+
+    def parent_exists(self) -> bool:
+        parents = self.get_parent_queryset().filter(pk=self.get_parent_id())
+        sql, params = parents.query.sql_with_params()
+        version = caching.get_cache_version(self.parent_model._meta.label_lower)
+        signature = sha1(f"{sql}:{params!r}".encode()).hexdigest()
+        cache_key = f"nested-parent:{version}:{signature}"
+
+        if cache.get(cache_key):
+            return True
+        exists = parents.exists()
+        if exists:
+            cache.set(cache_key, True, settings.NESTED_PARENT_CACHE_TIMEOUT)
+        return exists
+
+    def check_parent(self):
+        if not self.parent_exists():
+            raise NotFound(self.parent_not_found_message)
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        results = response.data.get('results') if isinstance(response.data, dict) else response.data
+        # A non-empty list already proves the parent.
+        if not results:
+            self.check_parent()
+        return response
+
+    def create(self, request, *args, **kwargs):
+        self.check_parent()
+        return super().create(request, *args, **kwargs)
+
+
+class ConditionalGetMixin:
+    """
+    ETag headers for the list and retrieve actions, derived from
+    a MAX(last_modified_field) and COUNT(*) fingerprint of the filtered queryset.
+    An unchanged resource is answered with a 304 response, before anything is serialized.
+
+    Only the retrieve responses have a Last-Modified header: the newest timestamp of a list
+    doesn't move when a row is deleted, leaves the filter or moves to another page.
+
+    The fingerprint only follows the rows of the queryset itself, the changes of the rendered
+    related objects (e.g. a customer's name) renew the ETags by the conditional_cache_versions.
+    The Last-Modified dates can't follow them, the clients should send If-None-Match as well.
+    """
+    last_modified_field = 'last_update'
+    # The cache versions bumped by the changes of the nested objects (see the signal receivers).
+    conditional_cache_versions = []
+
+    def get_fingerprint(self, queryset) -> dict:
+        return queryset.order_by().aggregate(
+            last_modified=Max(self.last_modified_field), count=Count('pk'))
+
+    def get_conditional_headers(self, fingerprint):
+        last_modified = fingerprint['last_modified']
+
+        # The same rows render differently per URL (e.g. pages or fields),
+        # user, serializer and format.
+        signature = ':'.join(str(value) for value in [
+            last_modified,
+            fingerprint['count'],
+            self.request.get_full_path(),
+            self.request.user.pk,
+            self.get_serializer_class().__name__,
+            self.request.accepted_renderer.format,
+            *(caching.get_cache_version(name) for name in self.conditional_cache_versions),
+        ])
+        etag = f'"{sha1(signature.encode()).hexdigest()}"'
+        # The HTTP dates have a one second precision.
+        return etag, int(last_modified.timestamp()) if last_modified else None
+
+    def conditional_response(self, queryset, render, single=False):
+        fingerprint = self.get_fingerprint(queryset)
+        if single and not fingerprint['count']:
+            # Let the view answer a missing object with a 404 status.
+            return render()
+
+        etag, last_modified = self.get_conditional_headers(fingerprint)
+        if not single:
+            # The lists are only validated by their ETags.
+            last_modified = None
+        response = get_conditional_response(
+            self.request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = render()
+
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            self.filter_queryset(self.get_queryset()),
+            lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            queryset = self.filter_queryset(self.get_queryset()) \
+                .filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except (TypeError, ValueError, ValidationError):
+            # An invalid lookup value is a missing object, as in get_object_or_404().
+            raise Http404
+        return self.conditional_response(
+            queryset,
+            lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs),
+            single=True
+        )
+
+
+class VersionedResponseCacheMixin:
+    """
+    Caches the list and retrieve responses under the cache version of the view's model.
+    The version is bumped on every save or delete of the model (see the signal receivers),
+    so the cached responses are dropped at once, and only when they actually changed.
+
+    The permissions are still checked before a cached response is served,
+    and only the successful responses are cached.
+    The queryset updates don't send any signals, the version must be bumped by hand after them.
+    """
+
+    def get_cache_version_name(self) -> str:
+        return self.get_queryset().model._meta.label_lower
+
+    def cached_response(self, render):
+        name = self.get_cache_version_name()
+        version = caching.get_cache_version(name)
+        signature = sha1(self.request.get_full_path().encode()).hexdigest()
+        cache_key = f"cached-response:{name}:{version}:{signature}"
+
+        data = cache.get(cache_key)
+        caching.count_cache_access(f'responses:{name}', hit=data is not None)
+        if data is not None:
+            return Response(data, status=status.HTTP_200_OK)
+
+        response = render()
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(cache_key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(
+            lambda: super(VersionedResponseCacheMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            lambda: super(VersionedResponseCacheMixin, self).retrieve(request, *args, **kwargs))
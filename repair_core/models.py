@@ -1,14 +1,80 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib import admin
 from django.forms import ValidationError
+from django.utils import timezone
+
+from .signals import service_statuses_changed
+from .utils import normalize_phone
+
+
+def build_search_document(user, phone: str) -> str:
+    """
+    The denormalized search text of a customer or a repairman (see FullTextSearchFilter).
+    """
+    values = [user.first_name, user.last_name, user.username, user.email, phone]
+    return ' '.join(value for value in values if value).lower()
+
+
+class LoadedValuesMixin:
+    """
+    Remembers the persisted values of the TRACKED_FIELDS on load and save,
+    so the receivers can detect the changes without another SELECT query.
+    """
+    TRACKED_FIELDS = []
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_loaded_values()
+        return instance
+
+    def remember_loaded_values(self):
+        # Deferred fields are not loaded, hence they're not remembered either.
+        self._loaded_values = {
+            field: self.__dict__[field]
+            for field in self.TRACKED_FIELDS if field in self.__dict__
+        }
+
+    def get_loaded_value(self, field, default=None):
+        """Returns the value of a tracked field as it was last loaded or saved."""
+        return getattr(self, '_loaded_values', {}).get(field, default)
+
+
+class ItemCountModel(models.Model):
+    """
+    A model with a materialized number of its service items.
+    The counters are maintained by the ServiceItem signal receivers (see apply_item_counts),
+    and can be reconciled using the reconcile_item_counts management command.
+    """
+    item_count = models.IntegerField(default=0, editable=False)
+
+    def save(self, *args, **kwargs):
+        # The counter is only moved by F() updates, a save must not write back a stale value.
+        if not self._state.adding and not kwargs.get('force_insert') \
+                and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'item_count'
+            ]
+        super().save(*args, **kwargs)
+
+    class Meta:
+        abstract = True
 
 
 class Customer(models.Model):
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     phone = models.CharField(max_length=255, unique=True)
+    # The digits of the phone number (see normalize_phone) for the prefix lookups.
+    phone_normalized = models.CharField(
+        max_length=255, blank=True, default='', editable=False, db_index=True)
+    # Kept in sync on save and by the User post_save signal receiver.
+    search_document = models.TextField(blank=True, default='', editable=False)
 
     def clean(self):
         if RepairMan.objects.filter(user=self.user).exists():
@@ -18,6 +84,11 @@ class Customer(models.Model):
 
     def save(self, *args, **kwargs):
         self.full_clean()
+        self.phone_normalized = normalize_phone(self.phone)
+        self.search_document = build_search_document(self.user, self.phone)
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {
+                *kwargs['update_fields'], 'phone_normalized', 'search_document'}
         super().save(*args, **kwargs)
 
     @admin.display(ordering='user__first_name')
@@ -42,6 +113,11 @@ class RepairMan(models.Model):
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     phone = models.CharField(max_length=255, unique=True)
+    # The digits of the phone number (see normalize_phone) for the prefix lookups.
+    phone_normalized = models.CharField(
+        max_length=255, blank=True, default='', editable=False, db_index=True)
+    # Kept in sync on save and by the User post_save signal receiver.
+    search_document = models.TextField(blank=True, default='', editable=False)
 
     def clean(self):
         if Customer.objects.filter(user=self.user).exists():
@@ -51,6 +127,11 @@ class RepairMan(models.Model):
 
     def save(self, *args, **kwargs):
         self.full_clean()
+        self.phone_normalized = normalize_phone(self.phone)
+        self.search_document = build_search_document(self.user, self.phone)
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {
+                *kwargs['update_fields'], 'phone_normalized', 'search_document'}
         super().save(*args, **kwargs)
 
     @admin.display(ordering='user__first_name')
@@ -71,7 +152,7 @@ class RepairMan(models.Model):
         ordering = ['user__first_name', 'user__last_name']
 
 
-class Category(models.Model):
+class Category(ItemCountModel):
     title = models.CharField(max_length=255, unique=True)
 
     def __str__(self):
@@ -82,7 +163,7 @@ class Category(models.Model):
         verbose_name_plural = 'Categories'  # It's not Categorys :lol:
 
 
-class Manufacturer(models.Model):
+class Manufacturer(ItemCountModel):
     name = models.CharField(max_length=255, unique=True)
 
     def __str__(self):
@@ -92,7 +173,7 @@ class Manufacturer(models.Model):
         ordering = ['name']
 
 
-class Service(models.Model):
+class Service(LoadedValuesMixin, ItemCountModel):
     SERVICE_RECEIVED = 'R'
     SERVICE_IN_PROGRESS = 'I'
     SERVICE_COMPLETED = 'C'
@@ -124,15 +205,233 @@ class Service(models.Model):
         to=Customer, on_delete=models.PROTECT, related_name='services')
     assigned_to = models.ManyToManyField(
         to=RepairMan, related_name='assignments', blank=True)
+    # Stamped on the transitions to the completed and delivered statuses.
+    completed_at = models.DateTimeField(null=True, blank=True, editable=False)
+    delivered_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    # The persisted values of these fields are remembered (see LoadedValuesMixin).
+    TRACKED_FIELDS = ['service_status', 'customer_id']
+
+    def stamp_status_transition(self, now) -> list:
+        """
+        Stamps the completion and delivery times when the status changes to them.
+        Returns the names of the stamped fields.
+        """
+        if self.service_status == self.get_loaded_value('service_status'):
+            return []
+
+        stamped_fields = []
+        # A service delivered right away has been completed at the same time.
+        if self.service_status == self.SERVICE_COMPLETED or \
+                (self.service_status == self.SERVICE_DELIVERED and self.completed_at is None):
+            self.completed_at = now
+            stamped_fields.append('completed_at')
+        if self.service_status == self.SERVICE_DELIVERED:
+            self.delivered_at = now
+            stamped_fields.append('delivered_at')
+        return stamped_fields
+
+    def save(self, *args, **kwargs):
+        stamped_fields = self.stamp_status_transition(timezone.now())
+        if stamped_fields and kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = list(kwargs['update_fields']) + stamped_fields
+
+        # Keep the rows written by the post_save receivers (e.g. the SMS outbox
+        # or the status counters) in the same transaction as the service itself.
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+        self.remember_loaded_values()
+
+    def add_assignees(self, repairman_ids) -> list:
+        """
+        Assigns the service to the given repairmen, with a single bulk insert.
+        Returns the ids of the newly assigned repairmen.
+        """
+        through = self.assigned_to.through
+        current = set(
+            through.objects.filter(service_id=self.pk, repairman_id__in=repairman_ids)
+            .values_list('repairman_id', flat=True)
+        )
+        added = [pk for pk in dict.fromkeys(repairman_ids) if pk not in current]
+        if added:
+            through.objects.bulk_create(
+                [through(service_id=self.pk, repairman_id=pk) for pk in added],
+                ignore_conflicts=True
+            )
+        return added
+
+    def remove_assignees(self, repairman_ids) -> int:
+        """
+        Unassigns the service from the given repairmen, with a single delete.
+        Returns the number of the removed assignments.
+        """
+        removed, _ = self.assigned_to.through.objects \
+            .filter(service_id=self.pk, repairman_id__in=repairman_ids) \
+            .delete()
+        return removed
+
+    def update_assignees(self, repairman_ids) -> bool:
+        """
+        Replaces the assigned repairmen by the given ones, only touching the changed rows.
+        Unlike assigned_to.set(), nothing is written when the assignees are unchanged.
+        Returns whether the assignees changed.
+        """
+        through = self.assigned_to.through
+        current = set(
+            through.objects.filter(service_id=self.pk).values_list('repairman_id', flat=True))
+        wanted = set(repairman_ids)
+        if current == wanted:
+            return False
+
+        with transaction.atomic():
+            if current - wanted:
+                self.remove_assignees(current - wanted)
+            if wanted - current:
+                through.objects.bulk_create(
+                    [through(service_id=self.pk, repairman_id=pk) for pk in wanted - current],
+                    ignore_conflicts=True
+                )
+        getattr(self, '_prefetched_objects_cache', {}).pop('assigned_to', None)
+        return True
+
+    @classmethod
+    def bulk_transition(cls, ids, service_status) -> list:
+        """
+        Transitions the given services to a status with a single UPDATE query.
+        The services which already have the status are left untouched.
+        Instead of a post_save per service, service_statuses_changed is sent once.
+        Returns the transitioned services.
+        """
+        now = timezone.now()
+        values = {'service_status': service_status, 'last_update': now}
+        # The same stamps as stamp_status_transition().
+        if service_status == cls.SERVICE_COMPLETED:
+            values['completed_at'] = now
+        if service_status == cls.SERVICE_DELIVERED:
+            values['completed_at'] = Coalesce(F('completed_at'), Value(now))
+            values['delivered_at'] = now
+
+        with transaction.atomic():
+            services = list(
+                cls.objects.select_for_update()
+                .filter(pk__in=ids)
+                .exclude(service_status=service_status)
+                .prefetch_related('customer__user')
+                .order_by('pk')
+            )
+            if not services:
+                return []
+            cls.objects.filter(pk__in=[service.pk for service in services]).update(**values)
+
+            for service in services:
+                service.service_status = service_status
+                service.last_update = now
+                if 'delivered_at' in values:
+                    service.completed_at = service.completed_at or now
+                    service.delivered_at = now
+                elif 'completed_at' in values:
+                    service.completed_at = now
+
+            service_statuses_changed.send(sender=cls, services=services)
+
+        for service in services:
+            service.remember_loaded_values()
+        return services
 
     def __str__(self):
         return f"Service ID #{self.pk}"
 
     class Meta:
         ordering = ['id']
+        indexes = [
+            # The keyset pagination seeks on (field, id) for every ordering field.
+            models.Index(fields=['priority', 'id']),
+            models.Index(fields=['last_update', 'id']),
+            models.Index(fields=['placed_at', 'id']),
+        ]
+
+
+class ServiceStatusCounter(models.Model):
+    """
+    Materialized number of services per status.
+    The counters are maintained by the Service signal receivers,
+    and can be rebuilt using the rebuild_service_counters management command.
+    """
+    # The scope is either a customer ID or zero for the counters of all services.
+    GLOBAL_SCOPE = 0
+
+    scope = models.PositiveBigIntegerField()
+    service_status = models.CharField(
+        max_length=1, choices=Service.SERVICE_STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+
+    @classmethod
+    def apply(cls, changes):
+        """
+        Apply a list of (delta, customer_id, service_status) changes
+        to the customer and the global counters.
+        """
+        deltas = {}
+        for delta, customer_id, service_status in changes:
+            for scope in (cls.GLOBAL_SCOPE, customer_id):
+                key = (scope, service_status)
+                deltas[key] = deltas.get(key, 0) + delta
+
+        # Updating the rows in a consistent order avoids deadlocks between the writers.
+        deltas = sorted((key, delta) for key, delta in deltas.items() if delta)
+        if not deltas:
+            return
+
+        cls.objects.bulk_create(
+            [cls(scope=scope, service_status=service_status)
+             for (scope, service_status), _ in deltas],
+            ignore_conflicts=True
+        )
+        for (scope, service_status), delta in deltas:
+            cls.objects.filter(scope=scope, service_status=service_status) \
+                .update(count=F('count') + delta)
+
+    def __str__(self):
+        return f"{self.count} service(s) with {self.service_status} status in scope {self.scope}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['scope', 'service_status'], name='service_status_counter_unique_scope'),
+        ]
+
+
+class ServiceThroughputRollup(models.Model):
+    """
+    Number of the services placed, completed and delivered per day.
+    The rollups are incrementally populated by the rollup_service_throughput management command.
+    """
+    day = models.DateField(unique=True)
+    placed = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+    delivered = models.IntegerField(default=0)
+    # The sum of the placement to delivery durations of the delivered services, in seconds.
+    turnaround_total = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Service throughput on {self.day}"
+
+    class Meta:
+        ordering = ['day']
+
+
+class RollupWatermark(models.Model):
+    """
+    The point in time up to which a rollup has processed the changes.
+    """
+    name = models.CharField(max_length=255, primary_key=True)
+    value = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} up to {self.value}"
 
 
-class ServiceItem(models.Model):
+class ServiceItem(LoadedValuesMixin, models.Model):
     name = models.CharField(max_length=255)
     serial_number = models.CharField(max_length=255)
     condition = models.CharField(max_length=255)
@@ -146,6 +445,54 @@ class ServiceItem(models.Model):
     service = models.ForeignKey(
         Service, on_delete=models.PROTECT, related_name='items')
 
+    # The relations with an item counter (see ItemCountModel).
+    COUNTED_RELATIONS = {
+        'category_id': Category,
+        'manufacturer_id': Manufacturer,
+        'service_id': Service,
+    }
+    # The persisted values of these fields are remembered (see LoadedValuesMixin).
+    TRACKED_FIELDS = list(COUNTED_RELATIONS)
+
+    def get_counted_relations(self, loaded: bool = False) -> dict:
+        """
+        The ids of the counted relations, either as they're set or as they were loaded.
+        The relations which were not loaded are taken as they're set.
+        """
+        return {
+            field: self.get_loaded_value(field, getattr(self, field)) if loaded
+            else getattr(self, field)
+            for field in self.COUNTED_RELATIONS
+        }
+
+    @classmethod
+    def apply_item_counts(cls, changes):
+        """
+        Apply a list of (delta, relations) changes to the item counters,
+        the relations are given by get_counted_relations().
+        """
+        deltas = {}
+        for delta, relations in changes:
+            for field, pk in relations.items():
+                if pk is not None:
+                    deltas[(field, pk)] = deltas.get((field, pk), 0) + delta
+
+        # The rows with the same change are updated at once.
+        # Updating them in a consistent order avoids deadlocks between the writers.
+        groups = {}
+        for (field, pk), delta in sorted(deltas.items()):
+            if delta:
+                groups.setdefault((field, delta), []).append(pk)
+        for (field, delta), pks in groups.items():
+            cls.COUNTED_RELATIONS[field].objects.filter(pk__in=pks) \
+                .update(item_count=F('item_count') + delta)
+
+    def save(self, *args, **kwargs):
+        # Keep the item counters written by the post_save receiver in the same transaction.
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+        self.remember_loaded_values()
+
     def __str__(self):
         if self.manufacturer:
             return f"{self.name} Manufactured by {self.manufacturer} in {self.service}"
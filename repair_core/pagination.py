@@ -1,12 +1,286 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from datetime import date
+from functools import cached_property, partial
+from hashlib import sha1
+from math import ceil
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+# The ways of counting the objects of a paginated list.
+COUNT_EXACT = 'exact'
+COUNT_CACHED = 'cached'
+COUNT_ESTIMATED = 'estimated'
+COUNT_NONE = 'false'
+
+COUNT_MODES = [COUNT_EXACT, COUNT_CACHED, COUNT_ESTIMATED, COUNT_NONE]
+
+
+def cached_count(queryset) -> int:
+    """
+    The count of a queryset, cached per SQL query for PAGINATION_COUNT_CACHE_TIMEOUT seconds.
+    """
+    sql, params = queryset.query.sql_with_params()
+    signature = sha1(f"{queryset.db}:{sql}:{params!r}".encode()).hexdigest()
+    cache_key = f"pagination-count:{signature}"
+
+    count = cache.get(cache_key)
+    if count is None:
+        count = queryset.count()
+        cache.set(cache_key, count, settings.PAGINATION_COUNT_CACHE_TIMEOUT)
+    return count
+
+
+def estimated_count(queryset) -> int:
+    """
+    The row count of the table statistics for the unfiltered MySQL lists,
+    otherwise the cached count.
+    """
+    connection = connections[queryset.db]
+    if queryset.query.where or queryset.query.distinct or connection.vendor != 'mysql':
+        return cached_count(queryset)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            [queryset.model._meta.db_table]
+        )
+        row = cursor.fetchone()
+
+    if row is None or row[0] is None:
+        return cached_count(queryset)
+    return row[0]
+
+
+class LookaheadPage(Page):
+    """
+    A page that knows whether there's a next page without knowing the count.
+    """
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+
+class CountModePaginator(Paginator):
+    """
+    A Django paginator with an exact, cached, estimated or no count at all.
+    Except for the exact mode, the pages read one extra object to find out
+    whether there's a next page, so the count doesn't have to be correct (or known).
+    """
+
+    def __init__(self, object_list, per_page, count_mode=COUNT_EXACT, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_mode = count_mode
+        # The number of pages known to exist, from the last read page.
+        self.pages_seen = 1
+
+    @cached_property
+    def count(self):
+        if self.count_mode == COUNT_CACHED:
+            return cached_count(self.object_list)
+        if self.count_mode == COUNT_ESTIMATED:
+            return estimated_count(self.object_list)
+        if self.count_mode == COUNT_NONE:
+            return None
+        return super().count
+
+    @property
+    def num_pages(self):
+        if self.count_mode == COUNT_EXACT:
+            return super().num_pages
+        if self.count is None:
+            return self.pages_seen
+        return max(ceil(self.count / self.per_page), self.pages_seen)
+
+    def validate_number(self, number):
+        if self.count_mode == COUNT_EXACT:
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages['invalid_page'])
+        if number < 1:
+            raise EmptyPage(self.error_messages['min_page'])
+        return number
+
+    def page(self, number):
+        if self.count_mode == COUNT_EXACT:
+            return super().page(number)
+
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        object_list = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not object_list and number > 1:
+            raise EmptyPage(self.error_messages['no_results'])
+
+        has_next = len(object_list) > self.per_page
+        self.pages_seen = number + 1 if has_next else number
+        return LookaheadPage(object_list[:self.per_page], number, self, has_next)
 
 
 class DefaultPagination(PageNumberPagination):
     """
     Custom definition of PageNumberPagination class.
     It comes with the page_size attribute defined by default.
+    The count is exact, cached, estimated or omitted, as requested by the count query parameter
+    or the PAGINATION_COUNT_MODE setting.
     """
     page_size = 10
     # https://www.django-rest-framework.org/api-guide/pagination/#modifying-the-pagination-style
     page_size_query_param = 'page_size'
     max_page_size = 50
+    count_query_param = 'count'
+
+    def get_count_mode(self, request) -> str:
+        count_mode = request.query_params.get(self.count_query_param)
+        if count_mode in COUNT_MODES:
+            return count_mode
+        return settings.PAGINATION_COUNT_MODE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count_mode = self.get_count_mode(request)
+        return super().paginate_queryset(queryset, request, view)
+
+    @property
+    def django_paginator_class(self):
+        return partial(CountModePaginator, count_mode=self.count_mode)
+
+    def get_page_number(self, request, paginator):
+        page_number = request.query_params.get(self.page_query_param) or 1
+        if page_number in self.last_page_strings and self.count_mode == COUNT_NONE:
+            # There's no way to tell the last page without counting.
+            raise NotFound(self.invalid_page_message)
+        return super().get_page_number(request, paginator)
+
+    def get_paginated_response(self, data):
+        if self.page.paginator.count is not None:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Keyset (seek) pagination over all of the ordering fields, with the id as the tie-breaker.
+    Unlike PageNumberPagination, it doesn't count the rows or scan the skipped ones.
+    Unlike CursorPagination, it doesn't use offsets to step over the equal positions,
+    so a page is a single range read of the ordering index at any depth.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+    # The same order as the page number pagination, unless the OrderingFilter says otherwise.
+    ordering = 'id'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor.reverse if self.cursor else False
+
+        # The previous page is read backwards from its cursor, and flipped afterwards.
+        ordering = [self.invert(field) for field in self.ordering] if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.cursor:
+            queryset = queryset.filter(self.get_keyset_filter(ordering, self.cursor.position))
+
+        # One extra object tells whether there's another page in this direction.
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        """
+        The requested ordering, followed by the id so every position is unique.
+        """
+        ordering = []
+        for field in super().get_ordering(request, queryset, view):
+            name = field.lstrip('-')
+            ordering.append('-id' if name == 'pk' and field.startswith('-') else
+                            'id' if name == 'pk' else field)
+            if name in ('id', 'pk'):
+                # The rest of the fields can't break any ties.
+                return tuple(ordering)
+        ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        return tuple(ordering)
+
+    def invert(self, field: str) -> str:
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def get_keyset_filter(self, ordering, position) -> Q:
+        """
+        Selects the objects after the position, e.g. for (-priority, id):
+        priority < p OR (priority = p AND id > i)
+        """
+        keyset_filter = Q()
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            keyset_filter |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return keyset_filter
+
+    def decode_cursor(self, request):
+        cursor = super().decode_cursor(request)
+        if cursor is None:
+            return None
+
+        try:
+            position = json.loads(cursor.position)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        # A cursor of another ordering is of no use here.
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return Cursor(offset=0, reverse=cursor.reverse, position=position)
+
+    def get_position(self, instance) -> str:
+        position = []
+        for field in self.ordering:
+            value = getattr(instance, field.lstrip('-'))
+            # Keep the microseconds, unlike DjangoJSONEncoder.
+            position.append(value.isoformat() if isinstance(value, date) else value)
+        return json.dumps(position, separators=(',', ':'))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=False, position=self.get_position(self.page[-1])))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=True, position=self.get_position(self.page[0])))
@@ -0,0 +1,113 @@
+"""
+Incremental service throughput rollups.
+
+Every run only reads the services updated since the previous run's watermark,
+and counts the placements, completions and deliveries that happened after it.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import RollupWatermark, Service, ServiceThroughputRollup
+
+WATERMARK_NAME = 'service-throughput'
+
+
+def rollup_service_throughput(lag: float = 60, chunk_size: int = 2000) -> tuple:
+    """
+    Add the service events since the last watermark to the daily rollups.
+    The events of the last `lag` seconds are left for the next run,
+    so the transactions that are still in flight are not missed.
+    Returns the number of the processed services and the new watermark.
+    """
+    with transaction.atomic():
+        watermark = RollupWatermark.objects.select_for_update() \
+            .filter(name=WATERMARK_NAME).first()
+        lower = watermark.value if watermark else None
+        upper = timezone.now() - timedelta(seconds=lag)
+        if lower is not None and upper <= lower:
+            return 0, lower
+
+        def in_window(moment):
+            return moment is not None and (lower is None or moment > lower) and moment <= upper
+
+        # The last_update is only bounded from below:
+        # a service updated after the upper bound may still have an event inside the window.
+        services = Service.objects.order_by() \
+            .only('placed_at', 'completed_at', 'delivered_at')
+        if lower is not None:
+            services = services.filter(last_update__gt=lower)
+
+        deltas = {}
+        processed = 0
+        for service in services.iterator(chunk_size=chunk_size):
+            processed += 1
+            events = [
+                ('placed', service.placed_at),
+                ('completed', service.completed_at),
+                ('delivered', service.delivered_at),
+            ]
+            for field, moment in events:
+                if not in_window(moment):
+                    continue
+                day = deltas.setdefault(timezone.localdate(moment), {})
+                day[field] = day.get(field, 0) + 1
+                if field == 'delivered':
+                    turnaround = (service.delivered_at - service.placed_at).total_seconds()
+                    day['turnaround_total'] = day.get('turnaround_total', 0) + int(turnaround)
+
+        if deltas:
+            ServiceThroughputRollup.objects.bulk_create(
+                [ServiceThroughputRollup(day=day) for day in deltas],
+                ignore_conflicts=True
+            )
+            for day, values in sorted(deltas.items()):
+                ServiceThroughputRollup.objects.filter(day=day).update(
+                    **{field: F(field) + value for field, value in values.items()}
+                )
+
+        RollupWatermark.objects.update_or_create(
+            name=WATERMARK_NAME, defaults={'value': upper})
+
+    return processed, upper
+
+
+def get_service_throughput(start, end, period: str = 'day') -> list:
+    """
+    Reads the service throughput between two dates (inclusive) from the rollups.
+    The period is either 'day' or 'week', the weeks start on Monday.
+    """
+    rollups = {
+        rollup.day: rollup
+        for rollup in ServiceThroughputRollup.objects.filter(day__gte=start, day__lte=end)
+    }
+
+    buckets = {}
+    day = start
+    while day <= end:
+        bucket_start = day if period == 'day' else day - timedelta(days=day.weekday())
+        bucket = buckets.setdefault(bucket_start, {
+            'period_start': bucket_start,
+            'placed': 0,
+            'completed': 0,
+            'delivered': 0,
+            'turnaround_total': 0,
+        })
+        rollup = rollups.get(day)
+        if rollup:
+            bucket['placed'] += rollup.placed
+            bucket['completed'] += rollup.completed
+            bucket['delivered'] += rollup.delivered
+            bucket['turnaround_total'] += rollup.turnaround_total
+        day += timedelta(days=1)
+
+    result = []
+    for bucket in buckets.values():
+        turnaround_total = bucket.pop('turnaround_total')
+        # In seconds, from the placement to the delivery.
+        bucket['average_turnaround'] = \
+            turnaround_total / bucket['delivered'] if bucket['delivered'] else None
+        result.append(bucket)
+    return result
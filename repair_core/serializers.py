@@ -1,18 +1,148 @@
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+from repair_core.caching import ReferenceTable
+from repair_core.mixins import SparseFieldsSerializerMixin
 from repair_core.models import Category, Customer, Manufacturer, RepairMan, Service, ServiceItem
 
 
 User = get_user_model()
 
 
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    A primary key related field which looks the values up in the objects
+    prefetched by its BulkListSerializer, instead of running a query per value.
+    """
+
+    def to_internal_value(self, data):
+        prefetched = getattr(self.root, 'prefetched_objects', {}).get(self.field_name)
+        if prefetched is None:
+            return super().to_internal_value(data)
+
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = self.get_queryset().model._meta.pk.to_python(data)
+        except (DjangoValidationError, TypeError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in prefetched:
+            self.fail('does_not_exist', pk_value=data)
+        return prefetched[pk]
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """
+    A many related field which validates the whole list of primary keys with a single query,
+    and reports all of the missing ones at once.
+    """
+    default_error_messages = {
+        'does_not_exist': 'Invalid pks {pk_values} - objects do not exist.',
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, (str, dict)) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        queryset = self.child_relation.get_queryset()
+        pks = []
+        for value in data:
+            if isinstance(value, bool):
+                self.child_relation.fail('incorrect_type', data_type=type(value).__name__)
+            try:
+                pks.append(queryset.model._meta.pk.to_python(value))
+            except (DjangoValidationError, TypeError):
+                self.child_relation.fail('incorrect_type', data_type=type(value).__name__)
+
+        # The default ordering is not needed for the lookup, and it may cost a join.
+        objects = queryset.order_by().in_bulk(set(pks))
+        missing = [value for value, pk in zip(data, pks) if pk not in objects]
+        if missing:
+            self.fail('does_not_exist', pk_values=list(dict.fromkeys(missing)))
+        return [objects[pk] for pk in dict.fromkeys(pks)]
+
+
+class BulkPrimaryKeyRelatedField(PrefetchedPrimaryKeyRelatedField):
+    """
+    A primary key related field which is validated with a single query when many=True.
+    Set it as the serializer_related_field of a model serializer to use it for every relation.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    A list serializer which validates the related primary keys with a single query per relation,
+    and saves the whole list using bulk_create() or bulk_update() in a single transaction.
+    For the updates, the instance is a dictionary of the objects by the ids of the given items.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.prefetch_related_objects(data)
+        return super().to_internal_value(data)
+
+    def prefetch_related_objects(self, data):
+        self.prefetched_objects = {}
+        for name, field in self.child.fields.items():
+            if field.read_only or not isinstance(field, PrefetchedPrimaryKeyRelatedField):
+                continue
+            queryset = field.get_queryset()
+            pks = set()
+            for item in data:
+                value = item.get(name) if isinstance(item, dict) else None
+                if isinstance(value, (int, str)) and not isinstance(value, bool):
+                    try:
+                        pks.add(queryset.model._meta.pk.to_python(value))
+                    except DjangoValidationError:
+                        pass
+            self.prefetched_objects[name] = queryset.in_bulk(pks)
+
+    def run_child_validation(self, data):
+        if isinstance(self.instance, dict):
+            self.child.instance = self.instance[data['id']]
+            self.child.initial_data = data
+        return super().run_child_validation(data)
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        with transaction.atomic():
+            return model.objects.bulk_create([model(**attrs) for attrs in validated_data])
+
+    def update(self, instances, validated_data):
+        objects = []
+        fields = set()
+        for item, attrs in zip(self.initial_data, validated_data):
+            obj = instances[item['id']]
+            for attr, value in attrs.items():
+                setattr(obj, attr, value)
+            fields.update(attrs)
+            objects.append(obj)
+
+        if fields:
+            with transaction.atomic():
+                self.child.Meta.model.objects.bulk_update(objects, sorted(fields))
+        return objects
+
+
 class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name']
 
 
-class CustomerSerializer(serializers.ModelSerializer):
+class CustomerSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     user_id = serializers.IntegerField()
     user_profile = UserProfileSerializer(source='user', read_only=True)
 
@@ -49,7 +179,7 @@ class CustomerUpdateSerializer(serializers.ModelSerializer):
         fields = ['phone']
 
 
-class RepairManSerializer(serializers.ModelSerializer):
+class RepairManSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     user_id = serializers.IntegerField()
     user_profile = UserProfileSerializer(source='user', read_only=True)
 
@@ -98,7 +228,7 @@ class ManufacturerSerializer(serializers.ModelSerializer):
         fields = ['id', 'name']
 
 
-class BasicServiceSerializer(serializers.ModelSerializer):
+class BasicServiceSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     """
     This is a basic version of Service model serializer
     which is mainly used with the customers.
@@ -109,7 +239,7 @@ class BasicServiceSerializer(serializers.ModelSerializer):
                   'last_update', 'description', 'estimation_delivery']
 
 
-class ListServiceSerializer(serializers.ModelSerializer):
+class ListServiceSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     customer = CustomerSerializer()
 
     class Meta:
@@ -118,17 +248,19 @@ class ListServiceSerializer(serializers.ModelSerializer):
                   'customer', 'priority']
 
 
-class RetrieveServiceSerializer(serializers.ModelSerializer):
+class RetrieveServiceSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     assigned_to = RepairManSerializer(many=True)
     customer = CustomerSerializer()
 
     class Meta:
         model = Service
-        fields = '__all__'
+        # The item counter doesn't move last_update, it would be stale behind the ETags.
+        exclude = ['item_count']
 
 
 class CreateServiceSerializer(serializers.ModelSerializer):
     id = serializers.IntegerField(read_only=True)
+    serializer_related_field = BulkPrimaryKeyRelatedField
 
     class Meta:
         model = Service
@@ -137,15 +269,56 @@ class CreateServiceSerializer(serializers.ModelSerializer):
 
 
 class UpdateServiceSerializer(serializers.ModelSerializer):
+    serializer_related_field = BulkPrimaryKeyRelatedField
+
+    def update(self, instance, validated_data):
+        assigned_to = validated_data.pop('assigned_to', None)
+        with transaction.atomic():
+            instance = super().update(instance, validated_data)
+            if assigned_to is not None:
+                # Only the added and the removed assignments are written.
+                instance.update_assignees([repairman.pk for repairman in assigned_to])
+        return instance
+
     class Meta:
         model = Service
         fields = ['service_status', 'priority',
                   'description', 'estimation_delivery', 'assigned_to']
 
 
+class ServiceAssigneesSerializer(serializers.Serializer):
+    assigned_to = BulkPrimaryKeyRelatedField(
+        queryset=RepairMan.objects.all(), many=True, allow_empty=False)
+
+
+# The serialized categories and manufacturers of this worker, by their ids.
+category_table = ReferenceTable(Category, CategorySerializer)
+manufacturer_table = ReferenceTable(Manufacturer, ManufacturerSerializer)
+
+
+class ReferenceTableField(serializers.Field):
+    """
+    Renders a foreign key by its serialized object from a ReferenceTable,
+    so the related table doesn't have to be joined. The source must be the key column.
+    """
+
+    def __init__(self, table: ReferenceTable, **kwargs):
+        self.table = table
+        # The table is fetched once per serializer, not once per object.
+        self.snapshot = None
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if self.snapshot is None or value not in self.snapshot:
+            self.table.get(value)
+            self.snapshot = self.table.table
+        return self.snapshot.get(value)
+
+
 class ServiceItemSerializer(serializers.ModelSerializer):
-    manufacturer = ManufacturerSerializer()
-    category = CategorySerializer()
+    manufacturer = ReferenceTableField(manufacturer_table, source='manufacturer_id')
+    category = ReferenceTableField(category_table, source='category_id')
 
     class Meta:
         model = ServiceItem
@@ -153,7 +326,38 @@ class ServiceItemSerializer(serializers.ModelSerializer):
                   'quantity', 'notes', 'manufacturer', 'category']
 
 
+class ServiceItemListSerializer(BulkListSerializer):
+    def save(self, **kwargs):
+        if self.instance is None:
+            kwargs['service_id'] = self.context['service_id']
+        return super().save(**kwargs)
+
+    def create(self, validated_data):
+        # bulk_create() doesn't send the post_save signals, the items are counted here.
+        with transaction.atomic():
+            items = super().create(validated_data)
+            ServiceItem.apply_item_counts(
+                [(1, item.get_counted_relations()) for item in items])
+        return items
+
+    def update(self, instances, validated_data):
+        # Neither does bulk_update(), the reassigned items are counted here.
+        with transaction.atomic():
+            items = super().update(instances, validated_data)
+            ServiceItem.apply_item_counts([
+                change for item in items for change in [
+                    (-1, item.get_counted_relations(loaded=True)),
+                    (1, item.get_counted_relations()),
+                ]
+            ])
+        for item in items:
+            item.remember_loaded_values()
+        return items
+
+
 class AddServiceItemSerializer(serializers.ModelSerializer):
+    serializer_related_field = PrefetchedPrimaryKeyRelatedField
+
     def save(self, **kwargs):
         service_id = self.context['service_id']
         self.instance = ServiceItem.objects.create(
@@ -164,9 +368,11 @@ class AddServiceItemSerializer(serializers.ModelSerializer):
         model = ServiceItem
         fields = ['name', 'serial_number', 'condition',
                   'quantity', 'notes', 'manufacturer', 'category']
+        list_serializer_class = ServiceItemListSerializer
 
 
 class UpdateServiceItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = ServiceItem
         fields = ['quantity', 'notes']
+        list_serializer_class = ServiceItemListSerializer
@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Sent by Service.bulk_transition() instead of a post_save per service.
+# The services argument is the list of the transitioned services,
+# their get_loaded_value('service_status') is still the previous status.
+service_statuses_changed = Signal()
@@ -1,14 +1,25 @@
 from django.contrib.auth.models import Permission
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
-from repair_core.models import RepairMan
+from repair_core.caching import bump_cache_version, service_statistics_key
+from repair_core.models import (
+    Category, Customer, Manufacturer, RepairMan, Service, ServiceItem, ServiceStatusCounter,
+    build_search_document)
 from repair_core.permissions import REPAIRMAN_DEFAULT_PERMISSIONS
+from repair_core.signals import service_statuses_changed
 
 
 User = get_user_model()
 
+# The user fields of the search documents (see build_search_document).
+SEARCHED_USER_FIELDS = {'first_name', 'last_name', 'username', 'email'}
+# The user fields of the nested user profiles (see UserProfileSerializer).
+PROFILE_USER_FIELDS = {'first_name', 'last_name', 'username', 'email'}
+
 
 @receiver(post_save, sender=RepairMan)
 def add_repairman_default_permissions(sender, instance, created, **kwargs):
@@ -44,3 +55,147 @@ def remove_repairman_permissions(sender, instance, **kwargs):
 
     # Revoke staff status
     User.objects.filter(pk=repairman_user.pk).update(is_staff=False)
+
+
+@receiver(post_save, sender=Service)
+def count_saved_service(sender, instance, created, raw=False, **kwargs):
+    """Keep the service status counters up to date on service creation or update"""
+    # Skip the fixtures loading, the counters can be rebuilt afterward.
+    if raw:
+        return
+
+    if created:
+        changes = [(1, instance.customer_id, instance.service_status)]
+    else:
+        old_status = instance.get_loaded_value('service_status')
+        old_customer_id = instance.get_loaded_value('customer_id')
+        if old_status is None or old_customer_id is None:
+            # The persisted values are unknown, there's nothing to compare.
+            return
+        if (old_status, old_customer_id) == (instance.service_status, instance.customer_id):
+            return
+        changes = [
+            (-1, old_customer_id, old_status),
+            (1, instance.customer_id, instance.service_status),
+        ]
+
+    ServiceStatusCounter.apply(changes)
+
+
+@receiver(service_statuses_changed, sender=Service)
+def count_transitioned_services(sender, services, **kwargs):
+    """Keep the service status counters up to date on a bulk status transition"""
+    changes = []
+    for service in services:
+        changes.append((-1, service.customer_id, service.get_loaded_value('service_status')))
+        changes.append((1, service.customer_id, service.service_status))
+    ServiceStatusCounter.apply(changes)
+
+
+@receiver(post_delete, sender=Service)
+def count_deleted_service(sender, instance, **kwargs):
+    """Keep the service status counters up to date on service deletion"""
+    ServiceStatusCounter.apply([(
+        -1,
+        instance.get_loaded_value('customer_id', instance.customer_id),
+        instance.get_loaded_value('service_status', instance.service_status),
+    )])
+
+
+@receiver(post_save, sender=ServiceItem)
+def count_saved_service_item(sender, instance, created, raw=False, **kwargs):
+    """Keep the item counters up to date on item creation or reassignment"""
+    # Skip the fixtures loading, the counters can be reconciled afterward.
+    if raw:
+        return
+
+    if created:
+        changes = [(1, instance.get_counted_relations())]
+    else:
+        changes = [
+            (-1, instance.get_counted_relations(loaded=True)),
+            (1, instance.get_counted_relations()),
+        ]
+    ServiceItem.apply_item_counts(changes)
+
+
+@receiver(post_delete, sender=ServiceItem)
+def count_deleted_service_item(sender, instance, **kwargs):
+    """Keep the item counters up to date on item deletion"""
+    ServiceItem.apply_item_counts([(-1, instance.get_counted_relations(loaded=True))])
+
+
+def invalidate_service_statistics(*customer_ids):
+    """Drop the cached statistics of all services and the given customers once committed"""
+    keys = [service_statistics_key(ServiceStatusCounter.GLOBAL_SCOPE)] + \
+        [service_statistics_key(customer_id) for customer_id in set(customer_ids)]
+    # Invalidating before the commit would let a concurrent request cache the old counters.
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+@receiver(post_save, sender=Service)
+def invalidate_saved_service_statistics(sender, instance, **kwargs):
+    """Invalidate the cached statistics on service creation or update"""
+    invalidate_service_statistics(
+        instance.customer_id,
+        instance.get_loaded_value('customer_id', instance.customer_id),
+    )
+
+
+@receiver(service_statuses_changed, sender=Service)
+def invalidate_transitioned_service_statistics(sender, services, **kwargs):
+    """Invalidate the cached statistics on a bulk status transition"""
+    invalidate_service_statistics(*(service.customer_id for service in services))
+
+
+@receiver(post_delete, sender=Service)
+def invalidate_deleted_service_statistics(sender, instance, **kwargs):
+    """Invalidate the cached statistics on service deletion"""
+    invalidate_service_statistics(instance.customer_id)
+
+
+@receiver(post_delete, sender=Service)
+def invalidate_deleted_service_lookups(sender, instance, **kwargs):
+    """Invalidate the cached existence checks of the nested routes (see NestedParentMixin)"""
+    transaction.on_commit(lambda: bump_cache_version(Service._meta.label_lower))
+
+
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Manufacturer)
+def invalidate_reference_responses(sender, instance, **kwargs):
+    """Invalidate the cached category or manufacturer responses (see VersionedResponseCacheMixin)"""
+    transaction.on_commit(lambda: bump_cache_version(sender._meta.label_lower))
+
+
+@receiver([post_save, post_delete], sender=Customer)
+@receiver([post_save, post_delete], sender=RepairMan)
+def invalidate_nested_profile_etags(sender, instance, **kwargs):
+    """Renew the ETags of the services rendering the profile (see ConditionalGetMixin)"""
+    transaction.on_commit(lambda: bump_cache_version(sender._meta.label_lower))
+
+
+@receiver(post_save, sender=User)
+def invalidate_nested_user_etags(sender, instance, created, raw, update_fields, **kwargs):
+    """Renew the ETags of the services rendering the user's profile (see ConditionalGetMixin)"""
+    # A new user has no profile yet, and e.g. the last_login updates aren't rendered.
+    if raw or created or (update_fields is not None and not PROFILE_USER_FIELDS & update_fields):
+        return
+
+    def bump():
+        for model in (Customer, RepairMan):
+            bump_cache_version(model._meta.label_lower)
+    transaction.on_commit(bump)
+
+
+@receiver(post_save, sender=User)
+def update_search_documents(sender, instance, created, raw, update_fields, **kwargs):
+    """Rebuild the search documents of the user's customer or repairman profile"""
+    # A new user has no profile yet, and e.g. the last_login updates don't change the documents.
+    if raw or created or (update_fields is not None and not SEARCHED_USER_FIELDS & update_fields):
+        return
+
+    for model in (Customer, RepairMan):
+        for profile_id, phone in model.objects.filter(user_id=instance.pk) \
+                .values_list('id', 'phone'):
+            model.objects.filter(pk=profile_id).update(
+                search_document=build_search_document(instance, phone))
@@ -1,13 +1,30 @@
+from datetime import date
+from itertools import count
+
 import pytest
 from rest_framework.test import APIClient
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Permission
+from django.core.cache import cache
+
+from repair_core.caching import reset_reference_tables
+from repair_core.models import Customer, Service
 
 
 # Get the default user model.
 User = get_user_model()
 
 
+@pytest.fixture(name='clear_cache', autouse=True)
+def fixture_clear_cache():
+    """Start and finish every test with an empty cache."""
+    cache.clear()
+    reset_reference_tables()
+    yield
+    cache.clear()
+    reset_reference_tables()
+
+
 @pytest.fixture(name='api_client')
 def fixture_api_client():
     """Returns a new APIClient object"""
@@ -34,6 +51,37 @@ def fixture_authenticate(api_client):
             )
             user.user_permissions.set(permissions)
 
-        return api_client.force_authenticate(user=user)
+        api_client.force_authenticate(user=user)
+        return user
 
     return do_authenticate
+
+
+@pytest.fixture(name='create_customer_instance')
+def fixture_create_customer_instance():
+    """Create and return a Customer instance, with a unique phone number by default."""
+    phones = (f'0912000{i:04d}' for i in count())
+
+    def _create_customer_instance(phone=None, user=None):
+        phone = phone or next(phones)
+        if user is None:
+            user = User.objects.create_user(
+                username=f'customer-{phone}',
+                email=f'{phone}@local.host',
+                first_name='John',
+                last_name='Doe',
+            )
+        return Customer.objects.create(user=user, phone=phone)
+    return _create_customer_instance
+
+
+@pytest.fixture(name='create_service_instance')
+def fixture_create_service_instance(create_customer_instance):
+    """Create and return a Service instance, for a new customer by default."""
+    def _create_service_instance(customer=None, **kwargs):
+        kwargs.setdefault('estimation_delivery', date(2024, 1, 1))
+        return Service.objects.create(
+            customer=customer or create_customer_instance(),
+            **kwargs
+        )
+    return _create_service_instance
@@ -1,5 +1,8 @@
 import pytest
 
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 
 from repair_core.models import Category
@@ -354,3 +357,72 @@ class TestDeleteCategory:
 
         assert response.status_code == status.HTTP_204_NO_CONTENT, \
             'Assert that a superuser can delete a specific category'
+
+
+@pytest.mark.django_db
+class TestCachedCategories:
+    """Test the cached responses of the /core/categories/ API endpoint."""
+
+    def test_if_list_is_served_from_cache(self, authenticate, create_category_instance,
+                                          get_categories_list):
+        """Test if the second list request doesn't read the categories."""
+        authenticate(is_superuser=True)
+        create_category_instance()
+
+        first = get_categories_list()
+        with CaptureQueriesContext(connection) as queries:
+            second = get_categories_list()
+
+        assert second.status_code == status.HTTP_200_OK
+        assert second.data == first.data
+        assert not [query for query in queries if 'repair_core_category' in query['sql']]
+
+    def test_if_update_invalidates_the_cache(self, authenticate, create_category_instance,
+                                             retrieve_category, update_category,
+                                             django_capture_on_commit_callbacks):
+        """Test if the cached responses are dropped once a category is updated."""
+        authenticate(is_superuser=True)
+        category = create_category_instance()
+
+        retrieve_category(category.id)
+        with django_capture_on_commit_callbacks(execute=True):
+            update_category(category.id, {'title': 'Mobile Phone'})
+        response = retrieve_category(category.id)
+
+        assert response.data['title'] == 'Mobile Phone'
+
+    def test_if_delete_invalidates_the_cache(self, authenticate, create_category_instance,
+                                             get_categories_list, delete_category,
+                                             django_capture_on_commit_callbacks):
+        """Test if the cached list is dropped once a category is deleted."""
+        authenticate(is_superuser=True)
+        category = create_category_instance()
+
+        get_categories_list()
+        with django_capture_on_commit_callbacks(execute=True):
+            delete_category(category.id)
+
+        assert get_categories_list().data['count'] == 0
+
+    def test_if_evicted_version_does_not_revive_the_cache(self, authenticate,
+                                                          create_category_instance,
+                                                          get_categories_list):
+        """Test if the responses of an evicted cache version are not served again."""
+        authenticate(is_superuser=True)
+
+        get_categories_list()
+        create_category_instance()
+        cache.delete('cache-version:repair_core.category')
+
+        assert get_categories_list().data['count'] == 1
+
+    def test_if_missing_category_is_not_cached(self, authenticate, create_category_instance,
+                                               retrieve_category):
+        """Test if a 404 response is not cached."""
+        authenticate(is_superuser=True)
+
+        missing = retrieve_category(1000)
+        Category.objects.create(id=1000, title='Laptop')
+
+        assert missing.status_code == status.HTTP_404_NOT_FOUND
+        assert retrieve_category(1000).status_code == status.HTTP_200_OK
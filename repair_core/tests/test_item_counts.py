@@ -0,0 +1,103 @@
+from io import StringIO
+
+import pytest
+
+from django.core.management import call_command
+from rest_framework import status
+
+from repair_core.models import Category, Manufacturer, Service, ServiceItem
+
+
+@pytest.fixture(name='service')
+def fixture_service(authenticate, create_service_instance):
+    """Authenticate as a staff superuser and return a new service."""
+    authenticate(is_staff=True, is_superuser=True)
+    return create_service_instance()
+
+
+def item_data(**kwargs):
+    """Return the POST data of a service item."""
+    return {'name': 'Laptop', 'serial_number': 'SN', 'condition': 'Used', **kwargs}
+
+
+def item_counts(*objects):
+    """Return the persisted item counters of the given objects."""
+    return [type(obj).objects.get(pk=obj.pk).item_count for obj in objects]
+
+
+@pytest.mark.django_db
+class TestItemCounts:
+    """Test the item counters of the categories, manufacturers and services."""
+
+    def test_if_created_items_are_counted(self, service, api_client):
+        """Test if both the single and the bulk item creations move the counters."""
+        category = Category.objects.create(title='Laptop')
+        manufacturer = Manufacturer.objects.create(name='Lenovo')
+
+        api_client.post(f'/core/services/{service.pk}/items/',
+                        item_data(category=category.pk), format='json')
+        api_client.post(f'/core/services/{service.pk}/items/',
+                        [item_data(category=category.pk, manufacturer=manufacturer.pk)] * 3,
+                        format='json')
+
+        assert item_counts(category, manufacturer, service) == [4, 3, 4]
+
+    def test_if_deleted_items_are_uncounted(self, service, api_client):
+        """Test if deleting an item moves the counters back."""
+        category = Category.objects.create(title='Laptop')
+        item = ServiceItem.objects.create(service=service, category=category)
+
+        response = api_client.delete(f'/core/services/{service.pk}/items/{item.pk}/')
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert item_counts(category, service) == [0, 0]
+
+    def test_if_reassigned_items_are_recounted(self, service):
+        """Test if moving an item to another category moves the counters."""
+        laptop = Category.objects.create(title='Laptop')
+        phone = Category.objects.create(title='Phone')
+        item = ServiceItem.objects.create(service=service, category=laptop)
+
+        item = ServiceItem.objects.get(pk=item.pk)
+        item.category = phone
+        item.save()
+        # Saving again without a reassignment must not count twice.
+        item.save()
+
+        assert item_counts(laptop, phone, service) == [0, 1, 1]
+
+    def test_if_stale_save_keeps_the_counter(self, service):
+        """Test if saving an object loaded before an item creation keeps its counter."""
+        category = Category.objects.create(title='Laptop')
+        stale = Category.objects.get(pk=category.pk)
+        ServiceItem.objects.create(service=service, category=category)
+
+        stale.title = 'Notebook'
+        stale.save()
+
+        assert item_counts(category) == [1]
+
+    def test_if_used_objects_cannot_be_deleted(self, service, api_client):
+        """Test if the delete guards follow the counters."""
+        category = Category.objects.create(title='Laptop')
+        item = ServiceItem.objects.create(service=service, category=category)
+
+        used = api_client.delete(f'/core/categories/{category.pk}/')
+        used_service = api_client.delete(f'/core/services/{service.pk}/')
+        item.delete()
+        unused = api_client.delete(f'/core/categories/{category.pk}/')
+
+        assert used.status_code == status.HTTP_405_METHOD_NOT_ALLOWED
+        assert used_service.status_code == status.HTTP_405_METHOD_NOT_ALLOWED
+        assert unused.status_code == status.HTTP_204_NO_CONTENT
+
+    def test_if_reconcile_fixes_the_drifted_counters(self, service):
+        """Test if the reconcile_item_counts command rewrites the wrong counters."""
+        category = Category.objects.create(title='Laptop')
+        ServiceItem.objects.bulk_create(
+            [ServiceItem(service=service, category=category) for _ in range(2)])
+        Service.objects.filter(pk=service.pk).update(item_count=5)
+
+        call_command('reconcile_item_counts', stdout=StringIO())
+
+        assert item_counts(category, service) == [2, 2]
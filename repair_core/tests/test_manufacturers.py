@@ -359,3 +359,20 @@ class TestDeleteManufacturer:
 
         assert response.status_code == status.HTTP_204_NO_CONTENT, \
             'Assert that a superuser can delete a specific manufacturer'
+
+
+@pytest.mark.django_db
+class TestCachedManufacturers:
+    """Test the cached responses of the /core/manufacturers/ API endpoint."""
+
+    def test_if_create_invalidates_the_cache(self, authenticate, get_manufacturers_list,
+                                             create_manufacturer,
+                                             django_capture_on_commit_callbacks):
+        """Test if the cached list is dropped once a manufacturer is created."""
+        authenticate(is_superuser=True)
+
+        get_manufacturers_list()
+        with django_capture_on_commit_callbacks(execute=True):
+            create_manufacturer({'name': 'Asus'})
+
+        assert get_manufacturers_list().data['count'] == 1
@@ -0,0 +1,99 @@
+from itertools import count
+
+import pytest
+
+from rest_framework import status
+
+from repair_core.models import Category
+from repair_core.permissions import REPAIRMAN_DEFAULT_PERMISSIONS
+
+
+@pytest.fixture(name='create_categories')
+def fixture_create_categories():
+    """Create the given number of categories."""
+    titles = (f'Category {i}' for i in count())
+
+    def _create_categories(number):
+        return Category.objects.bulk_create(
+            Category(title=next(titles)) for _ in range(number)
+        )
+    return _create_categories
+
+
+@pytest.fixture(name='get_categories')
+def fixture_get_categories(api_client):
+    """Perform HTTP GET request on /core/categories/ API endpoint."""
+    def _get_categories(**params):
+        return api_client.get('/core/categories/', params)
+    return _get_categories
+
+
+@pytest.mark.django_db
+class TestPaginationCountModes:
+    """Test the count modes of the default pagination."""
+
+    def test_if_exact_count_is_the_default(self, authenticate, create_categories, get_categories):
+        """Test if the lists are counted exactly by default."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        create_categories(3)
+
+        response = get_categories(page_size=2)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == 3
+        assert response.data['next'] is not None
+
+    def test_if_count_can_be_omitted(self, authenticate, create_categories, get_categories):
+        """Test if the count is left out and the pages still link to each other."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        create_categories(3)
+
+        first_page = get_categories(page_size=2, count='false')
+        last_page = get_categories(page_size=2, count='false', page=2)
+
+        assert 'count' not in first_page.data
+        assert len(first_page.data['results']) == 2
+        assert first_page.data['next'] is not None
+        assert len(last_page.data['results']) == 1
+        assert last_page.data['next'] is None
+        assert last_page.data['previous'] is not None
+
+    def test_if_page_beyond_the_end_returns_404(self, authenticate, create_categories,
+                                                get_categories):
+        """Test if an empty page gets a 404 status without a count"""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        create_categories(3)
+
+        response = get_categories(page_size=2, count='false', page=3)
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_if_cached_count_is_reused(self, authenticate, create_categories, get_categories,
+                                       django_capture_on_commit_callbacks):
+        """Test if the cached count is served until it expires, while the pages stay accurate."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        create_categories(2)
+        get_categories(page_size=2, count='cached')
+        # Drop the cached category responses, but not the cached count.
+        with django_capture_on_commit_callbacks(execute=True):
+            Category.objects.create(title='Another category')
+
+        first_page = get_categories(page_size=2, count='cached')
+        last_page = get_categories(page_size=2, count='cached', page=2)
+
+        assert first_page.data['count'] == 2
+        # The page after the stale count is still reachable.
+        assert first_page.data['next'] is not None
+        assert len(last_page.data['results']) == 1
+
+    def test_if_default_count_mode_is_configurable(self, settings, authenticate,
+                                                   create_categories, get_categories):
+        """Test if the PAGINATION_COUNT_MODE setting picks the count mode."""
+        settings.PAGINATION_COUNT_MODE = 'false'
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        create_categories(1)
+
+        response = get_categories()
+
+        assert 'count' not in response.data
+        assert len(response.data['results']) == 1
@@ -0,0 +1,139 @@
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+from repair_core.models import Customer
+from repair_core.permissions import REPAIRMAN_DEFAULT_PERMISSIONS
+from repair_core.utils import normalize_phone
+
+
+@pytest.fixture(name='phone_lookup')
+def fixture_phone_lookup(api_client):
+    """Perform HTTP GET request on /core/customers/phone_lookup/ API endpoint."""
+    def _phone_lookup(phone):
+        return api_client.get('/core/customers/phone_lookup/', {'phone': phone})
+    return _phone_lookup
+
+
+@pytest.mark.parametrize('phone', [
+    '09121234567', '+98 912 123 4567', '0098-912-1234567', '989121234567',
+    '9121234567', '۰۹۱۲۱۲۳۴۵۶۷',
+])
+def test_if_phone_variants_are_normalized(phone):
+    """Test if the phone number variants share the same normalized digits."""
+    assert normalize_phone(phone) == '9121234567'
+
+
+def test_if_short_phones_are_kept():
+    """Test if the short numbers and the prefixes are not mistaken for country codes."""
+    assert normalize_phone('1') == '1'
+    assert normalize_phone('98') == '98'
+    assert normalize_phone('0912') == '912'
+
+
+@pytest.mark.django_db
+class TestPhoneLookup:
+    """Test the /core/customers/phone_lookup/ API endpoint."""
+
+    def test_if_normalized_phone_is_saved(self, create_customer_instance):
+        """Test if the normalized phone is kept in sync with the phone."""
+        customer = create_customer_instance(phone='+98 912 000 0001')
+
+        customer.phone = '0935 000 0001'
+        customer.save(update_fields=['phone'])
+
+        assert Customer.objects.get(pk=customer.pk).phone_normalized == '9350000001'
+
+    def test_if_prefix_finds_the_customers(self, authenticate, create_customer_instance,
+                                           phone_lookup):
+        """Test if the customers are found by any variant of their phone prefix."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        customer = create_customer_instance(phone='09121234567')
+        create_customer_instance(phone='09351234567')
+
+        response = phone_lookup('+98 912 12')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == [{
+            'id': customer.pk,
+            'phone': customer.phone,
+            'first_name': customer.user.first_name,
+            'last_name': customer.user.last_name,
+        }]
+
+    def test_if_short_prefix_returns_400(self, authenticate, phone_lookup):
+        """Test if a prefix with too few digits gets a 400 status"""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+
+        response = phone_lookup('09')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_if_user_without_permission_returns_403(self, authenticate, phone_lookup):
+        """Test if a user without the view_customer permission gets a 403 status"""
+        authenticate()
+
+        response = phone_lookup('0912')
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.fixture(name='phone_availability')
+def fixture_phone_availability(api_client):
+    """Perform HTTP POST request on /core/customers/phone_availability/ API endpoint."""
+    def _phone_availability(data):
+        return api_client.post('/core/customers/phone_availability/', data, format='json')
+    return _phone_availability
+
+
+@pytest.mark.django_db
+class TestPhoneAvailability:
+    """Test the /core/customers/phone_availability/ API endpoint."""
+
+    def test_if_single_phone_keeps_its_contract(self, authenticate, create_customer_instance,
+                                                phone_availability):
+        """Test if a single used phone, in any format, gets a 400 status"""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        create_customer_instance(phone='09121234567')
+
+        assert phone_availability({'phone': '+98 912 123 4567'}).status_code == \
+            status.HTTP_400_BAD_REQUEST
+        assert phone_availability({'phone': '09351234567'}).status_code == status.HTTP_200_OK
+        assert phone_availability({}).status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_if_phones_are_checked_in_bulk(self, authenticate, create_customer_instance,
+                                           phone_availability):
+        """Test if a list of phones is answered with an availability map."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        create_customer_instance(phone='09121234567')
+        phones = ['0912 123 4567', '09351234567', '---']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = phone_availability({'phones': phones})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len([
+            query for query in queries
+            if query['sql'].startswith('SELECT') and 'FROM "repair_core_customer"' in query['sql']
+        ]) == 1
+        assert response.data == {'0912 123 4567': False, '09351234567': True, '---': False}
+
+    def test_if_too_many_phones_return_400(self, settings, authenticate, phone_availability):
+        """Test if a list longer than the limit gets a 400 status"""
+        settings.PHONE_AVAILABILITY_MAX_PHONES = 2
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+
+        response = phone_availability({'phones': ['1', '2', '3']})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_if_repairmen_share_the_check(self, authenticate, api_client):
+        """Test if the repairmen endpoint answers the bulk checks too."""
+        authenticate(is_superuser=True)
+
+        response = api_client.post(
+            '/core/repairmen/phone_availability/', {'phones': ['09121234567']}, format='json')
+
+        assert response.data == {'09121234567': True}
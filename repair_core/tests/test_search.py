@@ -0,0 +1,131 @@
+from unittest import mock
+
+import pytest
+
+from django.db import connections
+from django.db.models.lookups import GreaterThan
+from rest_framework import status
+from rest_framework.request import Request
+
+from repair_core.filters import FullTextMatch, FullTextSearchFilter
+from repair_core.models import Customer, RepairMan
+from repair_core.permissions import REPAIRMAN_DEFAULT_PERMISSIONS
+
+
+@pytest.fixture(name='search')
+def fixture_search(api_client):
+    """Perform HTTP GET search request on an API endpoint, return the found IDs."""
+    def _search(url, term):
+        response = api_client.get(url, {'search': term})
+        assert response.status_code == status.HTTP_200_OK
+        return [result['id'] for result in response.data['results']]
+    return _search
+
+
+@pytest.mark.django_db
+class TestFullTextSearch:
+    """Test the search of the customers and the repairmen."""
+
+    def test_if_every_term_must_match(self, authenticate, create_customer_instance, search):
+        """Test if the customers matching all the search terms are found."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        customer = create_customer_instance(phone='09121234567')
+        create_customer_instance()
+        customer.user.first_name = 'Jane'
+        customer.user.save()
+
+        assert search('/core/customers/', 'jane doe') == [customer.pk]
+        assert search('/core/customers/', 'JANE') == [customer.pk]
+        assert search('/core/customers/', 'jane smith') == []
+        assert search('/core/customers/', '4567') == [customer.pk]
+
+    def test_if_partial_phones_are_found(self, authenticate, create_customer_instance, search):
+        """Test if the phone-like terms are matched against the normalized phones."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        customer = create_customer_instance(phone='09121234567')
+        create_customer_instance(phone='09350000000')
+
+        assert search('/core/customers/', '1234567') == [customer.pk]
+        assert search('/core/customers/', '+98912') == [customer.pk]
+        assert search('/core/customers/', '۰۹۱۲۱۲۳') == [customer.pk]
+
+    def test_if_digits_are_found_in_other_values(self, authenticate,
+                                                 create_customer_instance, search):
+        """Test if the phone-like terms are still matched against the usernames and the emails."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        customer = create_customer_instance(phone='09121234567')
+        create_customer_instance(phone='09350000000')
+        customer.user.username = 'tech2024'
+        customer.user.email = 'ali-88@example.com'
+        customer.user.save()
+
+        assert search('/core/customers/', '2024') == [customer.pk]
+        assert search('/core/customers/', '-88') == [customer.pk]
+
+    def test_if_mysql_terms_are_split(self, settings):
+        """Test if the MySQL path sends the phones, the prefixes and the short terms apart."""
+        settings.SEARCH_FULLTEXT_MIN_TOKEN_SIZE = 3
+        search_filter = FullTextSearchFilter()
+
+        phone_terms, fulltext_terms, like_terms = search_filter.split_search_terms(
+            ['0912123', 'Jane', 'doe@example.com', 'jo', 'jo.doe'], fulltext=True)
+
+        assert phone_terms == [('0912123', '912123')]
+        assert fulltext_terms == ['jane', 'doe@example.com']
+        assert like_terms == ['jo', 'jo.doe']
+        assert search_filter.get_fulltext_query(fulltext_terms) == \
+            '+jane* +doe* +example* +com*'
+
+    def test_if_prefix_and_mid_word_matches_are_found(self, authenticate,
+                                                      create_customer_instance, search):
+        """Test if a term finds both the words it starts and the words it's in the middle of."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        sonia = create_customer_instance()
+        jackson = create_customer_instance()
+        create_customer_instance()
+        for customer, first_name in [(sonia, 'Sonia'), (jackson, 'Jackson')]:
+            customer.user.first_name = first_name
+            customer.user.save()
+
+        assert sorted(search('/core/customers/', 'son')) == sorted([sonia.pk, jackson.pk])
+
+    def test_if_mysql_terms_match_by_fulltext_or_like(self, rf):
+        """Test if every MySQL term is matched by the FULLTEXT index or by a LIKE query."""
+        request = Request(rf.get('/', {'search': 'jackson'}))
+        queryset = Customer.objects.all()
+
+        with mock.patch.object(connections[queryset.db], 'vendor', 'mysql'):
+            sql = str(FullTextSearchFilter().filter_queryset(request, queryset, None).query)
+
+        assert 'MATCH ("repair_core_customer"."search_document") AGAINST (+jackson* ' \
+            'IN BOOLEAN MODE) > 0' in sql
+        assert 'OR "repair_core_customer"."search_document" LIKE %jackson%' in sql
+
+    def test_if_mysql_match_is_built(self):
+        """Test if the FULLTEXT terms are matched in boolean mode."""
+        queryset = Customer.objects.filter(
+            GreaterThan(FullTextMatch('search_document', '+jane*'), 0))
+
+        assert 'MATCH ("repair_core_customer"."search_document") AGAINST (' \
+            in str(queryset.query)
+        assert 'IN BOOLEAN MODE) > 0' in str(queryset.query)
+
+    def test_if_search_document_follows_the_profile(self, create_customer_instance):
+        """Test if the search document is rebuilt when the phone number changes."""
+        customer = create_customer_instance()
+
+        customer.phone = '09350000000'
+        customer.save()
+
+        assert '09350000000' in Customer.objects.get(pk=customer.pk).search_document
+
+    def test_if_user_changes_update_repairman_document(self, create_customer_instance):
+        """Test if renaming a user updates the search document of their repairman profile."""
+        user = create_customer_instance().user
+        user.customer.delete()
+        repairman = RepairMan.objects.create(user=user, phone='09130000000')
+
+        user.last_name = 'Smith'
+        user.save()
+
+        assert 'smith' in RepairMan.objects.get(pk=repairman.pk).search_document
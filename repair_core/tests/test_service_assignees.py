@@ -0,0 +1,150 @@
+import pytest
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+from repair_core.models import RepairMan
+from repair_core.permissions import REPAIRMAN_DEFAULT_PERMISSIONS
+
+
+User = get_user_model()
+
+
+@pytest.fixture(name='create_repairmen')
+def fixture_create_repairmen():
+    """Create the given number of repairmen."""
+    def _create_repairmen(number):
+        return [
+            RepairMan.objects.create(
+                user=User.objects.create_user(username=f'repairman-{i}'),
+                phone=f'0913000{i:04d}'
+            )
+            for i in range(number)
+        ]
+    return _create_repairmen
+
+
+@pytest.fixture(name='update_service')
+def fixture_update_service(api_client):
+    """Perform HTTP PATCH request on /core/services/{service_id}/ endpoint."""
+    def _update_service(service_id, data):
+        return api_client.patch(f'/core/services/{service_id}/', data, format='json')
+    return _update_service
+
+
+@pytest.mark.django_db
+class TestServiceAssignees:
+    """Test the assignment of the services to the repairmen."""
+
+    def test_if_assignees_are_validated_with_one_query(self, authenticate, create_repairmen,
+                                                       create_service_instance, update_service):
+        """Test if all the assigned repairmen are validated by a single query."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        repairmen = create_repairmen(4)
+        service = create_service_instance()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = update_service(
+                service.pk, {'assigned_to': [repairman.pk for repairman in repairmen]})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert set(service.assigned_to.values_list('pk', flat=True)) == \
+            {repairman.pk for repairman in repairmen}
+        assert len([
+            query for query in queries
+            if query['sql'].startswith('SELECT')
+            and 'WHERE "repair_core_repairman"."id" IN' in query['sql']
+        ]) == 1
+
+    def test_if_all_missing_assignees_are_reported(self, authenticate, create_repairmen,
+                                                   create_service_instance, update_service):
+        """Test if every unknown repairman id is listed in the error."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        (repairman,) = create_repairmen(1)
+        service = create_service_instance()
+
+        response = update_service(
+            service.pk, {'assigned_to': [repairman.pk, repairman.pk + 1, repairman.pk + 2]})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert f'[{repairman.pk + 1}, {repairman.pk + 2}]' in str(response.data['assigned_to'])
+        assert not service.assigned_to.exists()
+
+    def test_if_invalid_assignee_returns_400(self, authenticate, create_service_instance,
+                                             update_service):
+        """Test if a non-integer repairman id gets a 400 status"""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        service = create_service_instance()
+
+        response = update_service(service.pk, {'assigned_to': ['x']})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_if_unchanged_assignees_are_not_written(self, authenticate, create_repairmen,
+                                                    create_service_instance, update_service):
+        """Test if resending the same assignees does not touch the assignments table."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        repairmen = create_repairmen(2)
+        service = create_service_instance()
+        service.assigned_to.set(repairmen)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = update_service(
+                service.pk, {'assigned_to': [repairman.pk for repairman in repairmen]})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert not [
+            query for query in queries
+            if query['sql'].startswith((
+                'INSERT INTO "repair_core_service_assigned_to"',
+                'DELETE FROM "repair_core_service_assigned_to"',
+            ))
+        ]
+
+    def test_if_assignees_are_replaced_by_diff(self, authenticate, create_repairmen,
+                                               create_service_instance, update_service):
+        """Test if only the changed assignments are written."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        first, second, third = create_repairmen(3)
+        service = create_service_instance()
+        service.assigned_to.set([first, second])
+
+        response = update_service(service.pk, {'assigned_to': [second.pk, third.pk]})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert set(service.assigned_to.values_list('pk', flat=True)) == {second.pk, third.pk}
+
+    def test_if_assignees_are_added_and_removed(self, authenticate, api_client, create_repairmen,
+                                                create_service_instance):
+        """Test if a single repairman is added or removed, and the service is touched."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        first, second = create_repairmen(2)
+        service = create_service_instance()
+        service.assigned_to.set([first])
+        last_update = service.last_update
+
+        response = api_client.patch(f'/core/services/{service.pk}/add_assignees/',
+                                    {'assigned_to': [second.pk]}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {'assigned_to': sorted([first.pk, second.pk])}
+        service.refresh_from_db()
+        assert service.last_update > last_update
+
+        response = api_client.patch(f'/core/services/{service.pk}/remove_assignees/',
+                                    {'assigned_to': [first.pk]}, format='json')
+
+        assert response.data == {'assigned_to': [second.pk]}
+
+    def test_if_unknown_assignee_cannot_be_added(self, authenticate, api_client,
+                                                 create_service_instance):
+        """Test if adding an unknown repairman gets a 400 status"""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        service = create_service_instance()
+
+        response = api_client.patch(f'/core/services/{service.pk}/add_assignees/',
+                                    {'assigned_to': [1000]}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,104 @@
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+from repair_core.models import Service, ServiceStatusCounter
+from repair_core.permissions import REPAIRMAN_DEFAULT_PERMISSIONS
+from sms_message.models import OutboxMessage
+
+
+@pytest.fixture(name='bulk_status')
+def fixture_bulk_status(api_client):
+    """Perform HTTP PATCH request on /core/services/bulk_status/ API endpoint."""
+    def _bulk_status(data):
+        return api_client.patch('/core/services/bulk_status/', data, format='json')
+    return _bulk_status
+
+
+@pytest.mark.django_db
+class TestServiceBulkStatus:
+    """Test the /core/services/bulk_status/ API endpoint."""
+
+    def test_if_services_are_transitioned_at_once(self, authenticate, create_service_instance,
+                                                  bulk_status):
+        """Test if the services are updated with a single UPDATE query, and stamped."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        services = [create_service_instance() for _ in range(3)]
+        delivered = create_service_instance(service_status=Service.SERVICE_DELIVERED)
+        ids = [service.pk for service in services] + [delivered.pk]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = bulk_status({'ids': ids, 'service_status': Service.SERVICE_DELIVERED})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {'updated': [service.pk for service in services]}
+        assert len([
+            query for query in queries if query['sql'].startswith('UPDATE "repair_core_service"')
+        ]) == 1
+        for service in Service.objects.filter(pk__in=response.data['updated']):
+            assert service.service_status == Service.SERVICE_DELIVERED
+            assert service.delivered_at == service.last_update
+            assert service.completed_at == service.delivered_at
+
+    def test_if_counters_follow_the_transition(self, authenticate, create_service_instance,
+                                               bulk_status):
+        """Test if the status counters are moved by a bulk transition."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        services = [create_service_instance() for _ in range(2)]
+
+        bulk_status({'ids': [service.pk for service in services],
+                     'service_status': Service.SERVICE_COMPLETED})
+
+        assert dict(
+            ServiceStatusCounter.objects
+            .filter(scope=ServiceStatusCounter.GLOBAL_SCOPE, count__gt=0)
+            .values_list('service_status', 'count')
+        ) == {Service.SERVICE_COMPLETED: 2}
+
+    def test_if_customers_are_notified_in_a_batch(self, settings, authenticate,
+                                                  create_service_instance, bulk_status):
+        """Test if every transitioned service gets a coalesced notification."""
+        settings.SMS_ENABLED = True
+        settings.SMS_API_KEY = 'test-api-key'
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        services = [create_service_instance() for _ in range(2)]
+
+        bulk_status({'ids': [service.pk for service in services],
+                     'service_status': Service.SERVICE_COMPLETED})
+
+        # The received notifications are replaced within the coalesce window.
+        assert OutboxMessage.objects.count() == 2
+        assert all('has been completed' in outbox_message.message
+                   for outbox_message in OutboxMessage.objects.all())
+
+    def test_if_missing_services_return_404(self, authenticate, create_service_instance,
+                                            bulk_status):
+        """Test if an unknown service id gets a 404 status, without updating anything."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        service = create_service_instance()
+
+        response = bulk_status({'ids': [service.pk, service.pk + 1],
+                                'service_status': Service.SERVICE_COMPLETED})
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert Service.objects.get().service_status == Service.SERVICE_RECEIVED
+
+    def test_if_invalid_status_returns_400(self, authenticate, create_service_instance,
+                                           bulk_status):
+        """Test if an unknown status gets a 400 status"""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        service = create_service_instance()
+
+        response = bulk_status({'ids': [service.pk], 'service_status': 'X'})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_if_user_without_permission_returns_403(self, authenticate, bulk_status):
+        """Test if a user without the change_service permission gets a 403 status"""
+        authenticate()
+
+        response = bulk_status({'ids': [1], 'service_status': Service.SERVICE_COMPLETED})
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -0,0 +1,133 @@
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+from repair_core.permissions import REPAIRMAN_DEFAULT_PERMISSIONS
+
+
+@pytest.mark.django_db
+class TestServiceConditionalGet:
+    """Test the conditional GET requests of the /core/services/ API endpoint."""
+
+    def test_if_unchanged_list_returns_304(self, api_client, authenticate,
+                                           create_service_instance):
+        """Test if a matching ETag gets a 304 status, without reading the services."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        create_service_instance()
+
+        response = api_client.get('/core/services/')
+        etag = response['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            not_modified = api_client.get('/core/services/', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert 'Last-Modified' not in response
+        assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+        assert not_modified['ETag'] == etag
+        # Only the fingerprint is read.
+        assert len([
+            query for query in queries
+            if query['sql'].startswith('SELECT') and 'FROM "repair_core_service"' in query['sql']
+        ]) == 1
+
+    def test_if_changed_list_returns_200(self, api_client, authenticate,
+                                         create_service_instance):
+        """Test if updating or deleting a service renews the ETag of the list."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        service = create_service_instance()
+        other = create_service_instance()
+
+        etag = api_client.get('/core/services/')['ETag']
+        service.priority = 1
+        service.save()
+        updated = api_client.get('/core/services/', HTTP_IF_NONE_MATCH=etag)
+        other.delete()
+        deleted = api_client.get('/core/services/', HTTP_IF_NONE_MATCH=updated['ETag'])
+
+        assert updated.status_code == status.HTTP_200_OK
+        assert updated['ETag'] != etag
+        assert deleted.status_code == status.HTTP_200_OK
+        assert deleted.data['count'] == 1
+
+    def test_if_list_ignores_if_modified_since(self, api_client, authenticate,
+                                               create_service_instance):
+        """Test if a list is not validated by a date, it stays the same after a deletion."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        service = create_service_instance()
+        create_service_instance().delete()
+
+        last_modified = api_client.get(f'/core/services/{service.pk}/')['Last-Modified']
+        response = api_client.get('/core/services/', HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == 1
+
+    def test_if_list_etag_depends_on_the_url(self, api_client, authenticate,
+                                             create_service_instance):
+        """Test if the ETag of a list is not reused for another page or fieldset."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        create_service_instance()
+
+        etag = api_client.get('/core/services/')['ETag']
+        response = api_client.get('/core/services/?fields=id', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_if_unchanged_service_returns_304(self, api_client, authenticate,
+                                              create_service_instance):
+        """Test if a service answers If-Modified-Since with a 304 status."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        service = create_service_instance()
+
+        response = api_client.get(f'/core/services/{service.pk}/')
+        not_modified = api_client.get(
+            f'/core/services/{service.pk}/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        by_etag = api_client.get(
+            f'/core/services/{service.pk}/', HTTP_IF_NONE_MATCH=response['ETag'])
+
+        assert response.status_code == status.HTTP_200_OK
+        assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+        assert by_etag.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_if_missing_service_returns_404(self, api_client, authenticate):
+        """Test if a missing service still gets a 404 status."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+
+        response = api_client.get('/core/services/1000/', HTTP_IF_NONE_MATCH='*')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert 'ETag' not in response
+
+    def test_if_invalid_service_id_returns_404(self, api_client, authenticate):
+        """Test if a non-numeric service id gets a 404 status."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+
+        response = api_client.get('/core/services/abc/')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_if_nested_changes_renew_the_etags(self, api_client, authenticate,
+                                               create_service_instance,
+                                               django_capture_on_commit_callbacks):
+        """Test if a change of the rendered customer or user renews the list and service ETags."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        service = create_service_instance()
+        list_etag = api_client.get('/core/services/')['ETag']
+        service_etag = api_client.get(f'/core/services/{service.pk}/')['ETag']
+
+        with django_capture_on_commit_callbacks(execute=True):
+            service.customer.user.first_name = 'Jane'
+            service.customer.user.save()
+        renamed = api_client.get('/core/services/', HTTP_IF_NONE_MATCH=list_etag)
+        with django_capture_on_commit_callbacks(execute=True):
+            service.customer.phone = '09350000000'
+            service.customer.save()
+        changed = api_client.get(
+            f'/core/services/{service.pk}/', HTTP_IF_NONE_MATCH=service_etag)
+
+        assert renamed.status_code == status.HTTP_200_OK
+        assert renamed.data['results'][0]['customer']['user_profile']['first_name'] == 'Jane'
+        assert changed.status_code == status.HTTP_200_OK
+        assert changed.data['customer']['phone'] == '09350000000'
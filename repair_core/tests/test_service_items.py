@@ -0,0 +1,246 @@
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+from repair_core.models import Category, Manufacturer, ServiceItem
+from repair_core.permissions import REPAIRMAN_DEFAULT_PERMISSIONS
+
+
+@pytest.fixture(name='service')
+def fixture_service(authenticate, create_service_instance):
+    """Authenticate as a repairman and return a new service."""
+    authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+    return create_service_instance()
+
+
+@pytest.fixture(name='create_items')
+def fixture_create_items(api_client):
+    """Perform HTTP POST request on /core/services/{service_id}/items/ API endpoint."""
+    def _create_items(service_id, data):
+        return api_client.post(f'/core/services/{service_id}/items/', data, format='json')
+    return _create_items
+
+
+@pytest.fixture(name='bulk_update_items')
+def fixture_bulk_update_items(api_client):
+    """Perform HTTP PATCH request on /core/services/{service_id}/items/bulk_update/ endpoint."""
+    def _bulk_update_items(service_id, data):
+        return api_client.patch(
+            f'/core/services/{service_id}/items/bulk_update/', data, format='json')
+    return _bulk_update_items
+
+
+def item_data(**kwargs):
+    """Return the POST data of a service item."""
+    return {'name': 'Laptop', 'serial_number': 'SN', 'condition': 'Used', **kwargs}
+
+
+@pytest.mark.django_db
+class TestBulkServiceItems:
+    """Test the bulk creation and update of the service items."""
+
+    def test_if_items_are_created_in_bulk(self, service, create_items):
+        """Test if a list of items is created with a single query per relation."""
+        category = Category.objects.create(title='Laptop')
+        manufacturer = Manufacturer.objects.create(name='Lenovo')
+        data = [
+            item_data(category=category.pk, manufacturer=manufacturer.pk)
+            for _ in range(5)
+        ]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = create_items(service.pk, data)
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert len(response.data) == 5
+        assert ServiceItem.objects.filter(
+            service=service, category=category, manufacturer=manufacturer).count() == 5
+        sql = [query['sql'] for query in queries]
+        assert len([q for q in sql if q.startswith('SELECT') and 'repair_core_category' in q]) == 1
+        assert len([q for q in sql if q.startswith('INSERT') and 'repair_core_serviceitem' in q]) == 1
+
+    def test_if_invalid_relations_reject_the_whole_list(self, service, create_items):
+        """Test if a missing category fails the request without creating any item."""
+        category = Category.objects.create(title='Laptop')
+
+        response = create_items(service.pk, [item_data(category=category.pk),
+                                             item_data(category=category.pk + 1)])
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        # The errors are keyed by the index of the invalid items.
+        assert list(response.data) == [1]
+        assert 'category' in response.data[1]
+        assert not ServiceItem.objects.exists()
+
+    def test_if_single_item_is_still_created(self, service, create_items):
+        """Test if posting a single object keeps working."""
+        response = create_items(service.pk, item_data())
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert ServiceItem.objects.count() == 1
+
+    def test_if_items_are_updated_in_bulk(self, service, bulk_update_items):
+        """Test if a list of items is updated with a single query."""
+        items = ServiceItem.objects.bulk_create(
+            ServiceItem(service=service, **item_data()) for _ in range(3))
+
+        response = bulk_update_items(service.pk, [
+            {'id': items[0].pk, 'quantity': 5},
+            {'id': items[1].pk, 'notes': 'Broken screen'},
+        ])
+
+        assert response.status_code == status.HTTP_200_OK
+        assert list(ServiceItem.objects.order_by('pk').values_list('quantity', 'notes')) == [
+            (5, None), (1, 'Broken screen'), (1, None)
+        ]
+
+    def test_if_items_of_other_services_return_404(self, service, create_service_instance,
+                                                   bulk_update_items):
+        """Test if updating the items of another service gets a 404 status"""
+        other_item = ServiceItem.objects.create(
+            service=create_service_instance(), **item_data())
+
+        response = bulk_update_items(service.pk, [{'id': other_item.pk, 'quantity': 5}])
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert ServiceItem.objects.get().quantity == 1
+
+    def test_if_invalid_update_returns_400(self, service, bulk_update_items):
+        """Test if a negative quantity fails the whole update."""
+        item = ServiceItem.objects.create(service=service, **item_data())
+
+        response = bulk_update_items(service.pk, [{'id': item.pk, 'quantity': -1}])
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestServiceItemsParent:
+    """Test the resolution of the parent service of the items."""
+
+    def test_if_missing_service_returns_404(self, service, api_client):
+        """Test if listing the items of a missing service gets a 404 status"""
+        response = api_client.get(f'/core/services/{service.pk + 1}/items/')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_if_service_without_items_returns_empty_list(self, service, api_client):
+        """Test if listing the items of an existing service without items gets a 200 status"""
+        response = api_client.get(f'/core/services/{service.pk}/items/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['results'] == []
+
+    def test_if_listed_items_prove_the_service(self, service, api_client):
+        """Test if a non-empty list does not look the service up separately."""
+        ServiceItem.objects.create(service=service, **item_data())
+
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get(f'/core/services/{service.pk}/items/')
+
+        assert len(response.data['results']) == 1
+        assert not [
+            query for query in queries
+            if query['sql'].startswith('SELECT') and 'FROM "repair_core_service" ' in query['sql']
+        ]
+
+    def test_if_items_of_missing_service_cannot_be_created(self, service, create_items):
+        """Test if creating an item for a missing service gets a 404 status"""
+        response = create_items(service.pk + 1, item_data())
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_if_items_of_missing_service_cannot_be_created_in_bulk(self, service, create_items):
+        """Test if creating a list of items for a missing service gets a 404 status"""
+        response = create_items(service.pk + 1, [item_data()])
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert not ServiceItem.objects.exists()
+
+    def test_if_items_of_other_customers_services_cannot_be_created(self, authenticate,
+                                                                    create_service_instance,
+                                                                    create_items):
+        """Test if a non-staff user can't add items to a service they don't own."""
+        authenticate(permissions=['add_serviceitem'])
+        service = create_service_instance()
+
+        single = create_items(service.pk, item_data())
+        bulk = create_items(service.pk, [item_data()])
+
+        assert single.status_code == status.HTTP_404_NOT_FOUND
+        assert bulk.status_code == status.HTTP_404_NOT_FOUND
+        assert not ServiceItem.objects.exists()
+
+    def test_if_deleted_service_is_not_cached(self, service, api_client,
+                                              django_capture_on_commit_callbacks):
+        """Test if the cached existence of a service is dropped with the service."""
+        url = f'/core/services/{service.pk}/items/'
+        api_client.get(url)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            service.delete()
+        response = api_client.get(url)
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_if_other_customers_services_return_404(self, authenticate, create_service_instance,
+                                                    api_client):
+        """Test if a non-staff user can't reach the items of a service they don't own."""
+        authenticate(permissions=['view_serviceitem'])
+        service = create_service_instance()
+        ServiceItem.objects.create(service=service, **item_data())
+
+        response = api_client.get(f'/core/services/{service.pk}/items/')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestServiceItemReferences:
+    """Test the categories and manufacturers of the listed items."""
+
+    def test_if_items_are_listed_without_joins(self, service, api_client):
+        """Test if the items are read alone, and their relations from the reference tables."""
+        category = Category.objects.create(title='Laptop')
+        manufacturer = Manufacturer.objects.create(name='Lenovo')
+        for _ in range(3):
+            ServiceItem.objects.create(
+                service=service, category=category, manufacturer=manufacturer)
+        api_client.get(f'/core/services/{service.pk}/items/')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get(f'/core/services/{service.pk}/items/')
+
+        assert response.data['results'][0]['category'] == {'id': category.pk, 'title': 'Laptop'}
+        assert response.data['results'][0]['manufacturer'] == \
+            {'id': manufacturer.pk, 'name': 'Lenovo'}
+        sql = [query['sql'] for query in queries]
+        assert not [q for q in sql if 'repair_core_category' in q or 'repair_core_manufacturer' in q]
+
+    def test_if_changed_category_is_reloaded(self, service, api_client,
+                                             django_capture_on_commit_callbacks):
+        """Test if a renamed category is rendered by its new title."""
+        category = Category.objects.create(title='Laptop')
+        ServiceItem.objects.create(service=service, category=category)
+        api_client.get(f'/core/services/{service.pk}/items/')
+
+        category.title = 'Notebook'
+        with django_capture_on_commit_callbacks(execute=True):
+            category.save()
+        response = api_client.get(f'/core/services/{service.pk}/items/')
+
+        assert response.data['results'][0]['category']['title'] == 'Notebook'
+
+    def test_if_new_category_is_loaded(self, service, api_client):
+        """Test if a category that is not in the reference table yet is still rendered."""
+        ServiceItem.objects.create(service=service)
+        api_client.get(f'/core/services/{service.pk}/items/')
+        category = Category.objects.create(title='Laptop')
+        ServiceItem.objects.create(service=service, category=category)
+
+        response = api_client.get(f'/core/services/{service.pk}/items/')
+
+        assert response.data['results'][0]['category'] is None
+        assert response.data['results'][1]['category']['title'] == 'Laptop'
@@ -0,0 +1,109 @@
+import pytest
+
+from rest_framework import status
+
+from repair_core.models import Service
+from repair_core.permissions import REPAIRMAN_DEFAULT_PERMISSIONS
+
+
+@pytest.fixture(name='get_services')
+def fixture_get_services(api_client):
+    """Perform HTTP GET request on /core/services/ API endpoint."""
+    def _get_services(url='/core/services/', **params):
+        return api_client.get(url, params)
+    return _get_services
+
+
+@pytest.fixture(name='create_services')
+def fixture_create_services(create_customer_instance, create_service_instance):
+    """Create services with the given priorities, for a single customer."""
+    def _create_services(priorities):
+        customer = create_customer_instance()
+        return [
+            create_service_instance(customer=customer, priority=priority)
+            for priority in priorities
+        ]
+    return _create_services
+
+
+@pytest.mark.django_db
+class TestServiceCursorPagination:
+    """Test the keyset pagination of the /core/services/ API endpoint."""
+
+    def test_if_page_number_pagination_is_the_default(self, authenticate, create_services,
+                                                      get_services):
+        """Test if the services are paginated by page numbers without the pagination parameter."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        create_services([1, 2, 3])
+
+        response = get_services(page_size=2)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == 3
+        assert len(response.data['results']) == 2
+
+    def test_if_pages_follow_the_ordering_with_ties(self, authenticate, create_services,
+                                                    get_services):
+        """Test if walking the pages forward and backward visits every service once, in order."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        services = create_services([5, 1, 5, 1, 5])
+        expected = [
+            service.pk for service in
+            sorted(services, key=lambda service: (-service.priority, -service.pk))
+        ]
+        # The ties are broken by the id, in the direction of the first ordering field.
+
+        pages = []
+        response = get_services(pagination='cursor', ordering='-priority', page_size=2)
+        while True:
+            assert response.status_code == status.HTTP_200_OK
+            assert 'count' not in response.data
+            pages.append([service['id'] for service in response.data['results']])
+            if not response.data['next']:
+                break
+            response = get_services(response.data['next'])
+
+        assert sum(pages, []) == expected
+        assert pages[0] == expected[:2]
+
+        # Walk back from the last page.
+        previous_pages = []
+        while response.data['previous']:
+            response = get_services(response.data['previous'])
+            previous_pages.insert(0, [service['id'] for service in response.data['results']])
+
+        assert previous_pages == pages[:-1]
+
+    def test_if_default_order_matches_page_numbers(self, authenticate, create_services,
+                                                   get_services):
+        """Test if the services are ordered by ascending id without an ordering, as by pages."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        services = create_services([1, 1, 1])
+
+        response = get_services(pagination='cursor')
+
+        assert [service['id'] for service in response.data['results']] == \
+            [service.pk for service in services]
+        assert response.data['results'] == get_services().data['results']
+        assert response.data['previous'] is None
+
+    def test_if_invalid_cursor_returns_404(self, authenticate, get_services):
+        """Test if a malformed cursor gets a 404 status"""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+
+        response = get_services(pagination='cursor', cursor='invalid')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_if_datetime_positions_are_exact(self, authenticate, create_services, get_services):
+        """Test if ordering by a timestamp does not skip or repeat services between pages."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        services = create_services([1, 1, 1, 1])
+        Service.objects.update(placed_at=services[0].placed_at)
+
+        response = get_services(pagination='cursor', ordering='placed_at', page_size=3)
+        first_page = [service['id'] for service in response.data['results']]
+        response = get_services(response.data['next'])
+        second_page = [service['id'] for service in response.data['results']]
+
+        assert first_page + second_page == [service.pk for service in services]
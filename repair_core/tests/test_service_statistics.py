@@ -0,0 +1,163 @@
+from io import StringIO
+
+import pytest
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+from repair_core.caching import get_cache_counters
+from repair_core.models import Service, ServiceStatusCounter
+from repair_core.permissions import REPAIRMAN_DEFAULT_PERMISSIONS
+
+
+@pytest.fixture(name='get_service_statistics')
+def fixture_get_service_statistics(api_client):
+    """Perform HTTP GET request on /core/service-statistics/ API endpoint."""
+    def _get_service_statistics():
+        return api_client.get('/core/service-statistics/')
+    return _get_service_statistics
+
+
+def get_counters(scope=ServiceStatusCounter.GLOBAL_SCOPE):
+    """Return the non-zero counters of a scope as a dictionary."""
+    return dict(
+        ServiceStatusCounter.objects.filter(scope=scope, count__gt=0)
+        .values_list('service_status', 'count')
+    )
+
+
+@pytest.mark.django_db
+class TestServiceStatusCounters:
+    """Test the maintenance of the materialized service status counters."""
+
+    def test_if_service_creation_is_counted(self, create_customer_instance,
+                                            create_service_instance):
+        """Test if creating services increments the global and the customer counters."""
+        customer = create_customer_instance()
+        create_service_instance(customer=customer)
+        create_service_instance()
+
+        assert get_counters() == {Service.SERVICE_RECEIVED: 2}
+        assert get_counters(customer.pk) == {Service.SERVICE_RECEIVED: 1}
+
+    def test_if_status_transition_moves_the_count(self, create_service_instance):
+        """Test if changing the status of a service moves it between the counters."""
+        service = create_service_instance()
+
+        service = Service.objects.get(pk=service.pk)
+        service.service_status = Service.SERVICE_COMPLETED
+        service.save()
+        # Saving again without a transition must not count twice.
+        service.priority = 1
+        service.save()
+
+        assert get_counters() == {Service.SERVICE_COMPLETED: 1}
+        assert get_counters(service.customer_id) == {Service.SERVICE_COMPLETED: 1}
+
+    def test_if_service_deletion_is_counted(self, create_service_instance):
+        """Test if deleting a service decrements its counters."""
+        service = create_service_instance()
+
+        service.delete()
+
+        assert get_counters() == {}
+
+    def test_if_rebuild_command_restores_the_counters(self, create_service_instance):
+        """Test if the counters are rebuilt from the services table."""
+        create_service_instance()
+        create_service_instance(service_status=Service.SERVICE_DELIVERED)
+        ServiceStatusCounter.objects.update(count=42)
+
+        call_command('rebuild_service_counters', stdout=StringIO())
+
+        assert get_counters() == {Service.SERVICE_RECEIVED: 1, Service.SERVICE_DELIVERED: 1}
+
+
+@pytest.mark.django_db
+class TestServiceStatistics:
+    """Test the /core/service-statistics/ API endpoint."""
+
+    def test_if_anonymous_user_get_request_returns_401(self, get_service_statistics):
+        """Test if anonymous user GET HTTP request returns a 401 status"""
+        response = get_service_statistics()
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_if_staff_user_gets_global_counters(self, authenticate, create_service_instance,
+                                                get_service_statistics):
+        """Test if a staff user gets the counters of all services."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        create_service_instance()
+        create_service_instance(service_status=Service.SERVICE_COMPLETED)
+
+        response = get_service_statistics()
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {Service.SERVICE_RECEIVED: 1, Service.SERVICE_COMPLETED: 1}
+
+    def test_if_customer_gets_own_counters(self, authenticate, create_customer_instance,
+                                           create_service_instance, get_service_statistics):
+        """Test if a customer only gets the counters of their own services."""
+        user = authenticate()
+        customer = create_customer_instance(user=user)
+        create_service_instance(customer=customer)
+        create_service_instance()
+
+        response = get_service_statistics()
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {Service.SERVICE_RECEIVED: 1}
+
+    def test_if_user_without_customer_returns_404(self, authenticate, get_service_statistics):
+        """Test if a user with no customer profile gets a 404 status"""
+        authenticate()
+
+        response = get_service_statistics()
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestServiceStatisticsCache:
+    """Test the caching of the /core/service-statistics/ API endpoint."""
+
+    def test_if_repeated_requests_are_served_from_cache(self, authenticate,
+                                                        create_service_instance,
+                                                        get_service_statistics):
+        """Test if the second request does not query the counters."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        create_service_instance()
+        get_service_statistics()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = get_service_statistics()
+
+        assert not any('servicestatuscounter' in query['sql'] for query in queries)
+        assert response.data == {Service.SERVICE_RECEIVED: 1}
+        assert get_cache_counters('service-statistics') == {'hits': 1, 'misses': 1}
+
+    def test_if_service_changes_invalidate_the_cache(self, authenticate, create_customer_instance,
+                                                     create_service_instance,
+                                                     get_service_statistics,
+                                                     django_capture_on_commit_callbacks):
+        """Test if saving or deleting a service drops the cached statistics of its scopes."""
+        user = authenticate()
+        customer = create_customer_instance(user=user)
+        with django_capture_on_commit_callbacks(execute=True):
+            service = create_service_instance(customer=customer)
+        get_service_statistics()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            service.service_status = Service.SERVICE_COMPLETED
+            service.save()
+        response = get_service_statistics()
+
+        assert response.data == {Service.SERVICE_COMPLETED: 1}
+
+        with django_capture_on_commit_callbacks(execute=True):
+            service.delete()
+        response = get_service_statistics()
+
+        assert response.data == {}
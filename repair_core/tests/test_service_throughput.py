@@ -0,0 +1,87 @@
+import pytest
+
+from django.utils import timezone
+from rest_framework import status
+
+from repair_core.models import Service, ServiceThroughputRollup
+from repair_core.permissions import REPAIRMAN_DEFAULT_PERMISSIONS
+from repair_core.rollups import rollup_service_throughput
+
+
+@pytest.fixture(name='get_service_throughput')
+def fixture_get_service_throughput(api_client):
+    """Perform HTTP GET request on /core/service-throughput/ API endpoint."""
+    def _get_service_throughput(params=None):
+        return api_client.get('/core/service-throughput/', params or {})
+    return _get_service_throughput
+
+
+def transition(service, service_status):
+    """Change the status of a service the way the API does."""
+    service = Service.objects.get(pk=service.pk)
+    service.service_status = service_status
+    service.save()
+    return service
+
+
+@pytest.mark.django_db
+class TestServiceThroughputRollups:
+    """Test the incremental service throughput rollups."""
+
+    def test_if_status_transitions_are_stamped(self, create_service_instance):
+        """Test if a delivered service has both completion and delivery times."""
+        service = create_service_instance()
+
+        service = transition(service, Service.SERVICE_DELIVERED)
+
+        assert service.completed_at is not None
+        assert service.delivered_at is not None
+
+    def test_if_events_are_rolled_up_once(self, create_service_instance):
+        """Test if the consecutive runs only count the new events."""
+        service = create_service_instance()
+        create_service_instance()
+        transition(service, Service.SERVICE_COMPLETED)
+
+        rollup_service_throughput(lag=0)
+        transition(service, Service.SERVICE_DELIVERED)
+        processed, _ = rollup_service_throughput(lag=0)
+
+        rollup = ServiceThroughputRollup.objects.get(day=timezone.localdate())
+        assert processed == 1
+        assert (rollup.placed, rollup.completed, rollup.delivered) == (2, 1, 1)
+
+
+@pytest.mark.django_db
+class TestServiceThroughput:
+    """Test the /core/service-throughput/ API endpoint."""
+
+    def test_if_non_staff_user_returns_403(self, authenticate, get_service_throughput):
+        """Test if a regular user cannot read the throughput"""
+        authenticate()
+
+        response = get_service_throughput()
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_if_staff_user_gets_the_rollups(self, authenticate, create_service_instance,
+                                            get_service_throughput):
+        """Test if a staff user gets the daily throughput from the rollups."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        transition(create_service_instance(), Service.SERVICE_DELIVERED)
+        rollup_service_throughput(lag=0)
+
+        response = get_service_throughput({'period': 'week'})
+        today = response.data[-1]
+
+        assert response.status_code == status.HTTP_200_OK
+        assert (today['placed'], today['completed'], today['delivered']) == (1, 1, 1)
+        assert today['average_turnaround'] is not None
+
+    def test_if_invalid_range_returns_400(self, authenticate, get_service_throughput):
+        """Test if an invalid date range returns a 400 status"""
+        authenticate(is_staff=True)
+
+        response = get_service_throughput({'start': '2024-02-01', 'end': '2024-01-01'})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
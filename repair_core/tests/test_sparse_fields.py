@@ -0,0 +1,115 @@
+import pytest
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+from repair_core.models import Customer
+from repair_core.permissions import REPAIRMAN_DEFAULT_PERMISSIONS
+
+
+User = get_user_model()
+
+
+@pytest.fixture(name='get_endpoint')
+def fixture_get_endpoint(api_client):
+    """Perform HTTP GET request on an API endpoint, and capture its SQL queries."""
+    def _get_endpoint(url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get(url, params)
+        response.queries = [query['sql'] for query in queries]
+        return response
+    return _get_endpoint
+
+
+def service_queries(response):
+    """The SQL queries of a response that read the service rows (not their count)."""
+    return [
+        sql for sql in response.queries
+        if sql.startswith('SELECT') and 'FROM "repair_core_service"' in sql
+        and 'COUNT(' not in sql
+    ]
+
+
+@pytest.mark.django_db
+class TestSparseFields:
+    """Test the ?fields= and ?expand= query parameters."""
+
+    def test_if_fields_trim_the_response_and_the_columns(self, authenticate,
+                                                         create_service_instance, get_endpoint):
+        """Test if only the requested fields are rendered and read."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        service = create_service_instance()
+
+        response = get_endpoint('/core/services/', fields='id,service_status')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['results'] == [
+            {'id': service.pk, 'service_status': service.service_status}
+        ]
+        (sql,) = service_queries(response)
+        assert 'JOIN' not in sql
+        assert '"description"' not in sql
+
+    def test_if_unexpanded_relations_are_collapsed(self, authenticate,
+                                                   create_service_instance, get_endpoint):
+        """Test if the nested relations that are not expanded are rendered as primary keys."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        service = create_service_instance()
+
+        response = get_endpoint('/core/services/', fields='id,customer', expand='')
+
+        assert response.data['results'] == [{'id': service.pk, 'customer': service.customer_id}]
+        (sql,) = service_queries(response)
+        assert 'JOIN' not in sql
+
+    def test_if_expanded_relations_are_joined(self, authenticate, create_service_instance,
+                                              get_endpoint):
+        """Test if an expanded relation is nested and read with a single query."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        service = create_service_instance()
+
+        response = get_endpoint(
+            f'/core/services/{service.pk}/', fields='id,customer,assigned_to', expand='customer')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['customer']['phone'] == service.customer.phone
+        assert response.data['customer']['user_profile']['id'] == service.customer.user_id
+        assert response.data['assigned_to'] == []
+        (sql,) = service_queries(response)
+        assert 'JOIN "repair_core_customer"' in sql
+        assert '"priority"' not in sql
+
+    def test_if_response_is_unchanged_without_parameters(self, authenticate,
+                                                         create_service_instance, get_endpoint):
+        """Test if the full representation is rendered by default."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        create_service_instance()
+
+        response = get_endpoint('/core/services/')
+
+        assert set(response.data['results'][0]) == \
+            {'id', 'placed_at', 'service_status', 'customer', 'priority'}
+        assert 'user_profile' in response.data['results'][0]['customer']
+
+    def test_if_other_viewsets_support_fields(self, authenticate, create_customer_instance,
+                                              get_endpoint):
+        """Test if the customers endpoint renders the requested fields."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        customer = create_customer_instance()
+
+        response = get_endpoint('/core/customers/', fields='id,phone')
+
+        assert response.data['results'] == [{'id': customer.pk, 'phone': customer.phone}]
+
+    def test_if_fields_do_not_drop_the_input_fields(self, authenticate, api_client):
+        """Test if a creation ignores the fields parameter."""
+        authenticate(is_staff=True, permissions=REPAIRMAN_DEFAULT_PERMISSIONS)
+        user = User.objects.create_user(username='new-customer')
+
+        response = api_client.post('/core/customers/?fields=id',
+                                   {'user_id': user.pk, 'phone': '09120000001'}, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert Customer.objects.filter(user=user, phone='09120000001').exists()
@@ -31,4 +31,7 @@ services_router.register('items', views.ServiceItemViewSet, basename='service-it
 # The /service-statistics API endpoint
 router.register('service-statistics', views.ServiceStatisticsViewSet, basename='service-statistics')
 
+# The /service-throughput API endpoint
+router.register('service-throughput', views.ServiceThroughputViewSet, basename='service-throughput')
+
 urlpatterns = router.urls + services_router.urls
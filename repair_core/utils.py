@@ -1,6 +1,40 @@
 """
 Repair Ninja Utilities.
 """
+import re
+
+# The Persian and the Arabic-Indic digits are typed by the users too.
+LOCAL_DIGITS = str.maketrans('۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩', '01234567890123456789')
+NON_DIGITS = re.compile(r'\D')
+
+
+def normalize_phone(phone: str) -> str:
+    """Reduces a phone number (or a prefix of it) to its national significant digits.
+
+    e.g. '+98 912 123 4567', '0098-912-1234567' and '09121234567' are all '9121234567'.
+
+    Args:
+        phone (str): Phone number, as typed
+
+    Returns:
+        str: The digits without the country code and the trunk prefix
+    """
+    phone = (phone or '').strip().translate(LOCAL_DIGITS)
+    international = phone.startswith('+')
+    digits = NON_DIGITS.sub('', phone)
+
+    if digits.startswith('00'):
+        international = True
+        digits = digits[2:]
+    # Without a plus sign, 98 is only a country code in a full international number.
+    if digits.startswith('98') and (international or len(digits) == 12):
+        digits = digits[2:]
+    elif digits.startswith('0'):
+        digits = digits[1:]
+
+    return digits
+
+
 def priority(value: int):
     """Translates the priority value into a human-readable string.
 
@@ -1,5 +1,11 @@
-from django.db.models import Count
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
 from django.http import HttpRequest
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.decorators import action
 from rest_framework.filters import OrderingFilter, SearchFilter
@@ -7,7 +13,11 @@ from rest_framework import mixins, permissions, status
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet, GenericViewSet, ViewSet
 
-from . import api_exceptions, models, serializers, pagination
+from . import api_exceptions, caching, models, serializers, pagination, rollups, utils
+from .filters import FullTextSearchFilter
+from .mixins import (
+    ConditionalGetMixin, NestedParentMixin, PhoneAvailabilityMixin, SparseFieldsViewMixin,
+    VersionedResponseCacheMixin)
 from .permissions import DjangoModelFullPermissions
 
 
@@ -20,18 +30,16 @@ class ServiceStatisticsViewSet(ViewSet):
     def list(self, request: HttpRequest, format=None) -> Response:
         """
         Process the get request.
+        The counts are read from the cache or the materialized service status counters.
         """
-        queryset = models.Service.objects.none()
-
         if request.user.is_staff:
-            # Get all service objects.
-            queryset = models.Service.objects.all() \
-                .only('service_status')
+            # The counters of all service objects.
+            scope = models.ServiceStatusCounter.GLOBAL_SCOPE
         else:
             user_id = request.user.id
             try:
-                customer_id = models.Customer.objects \
-                    .only('id').get(user_id=user_id)
+                scope = models.Customer.objects \
+                    .values_list('id', flat=True).get(user_id=user_id)
             except models.Customer.DoesNotExist:
                 return Response(
                     data={
@@ -44,21 +52,69 @@ class ServiceStatisticsViewSet(ViewSet):
                     },
                     status=status.HTTP_404_NOT_FOUND
                 )
-            # Filter all the service objects that belongs the this customer.
-            queryset = models.Service.objects.filter(customer_id=customer_id) \
-                .only('service_status')
-
-        count_queryset = queryset.values('service_status')\
-            .annotate(status_count=Count('service_status'))
-        data = {entry['service_status']: entry['status_count']
-                for entry in count_queryset}
+
+        # The responses are cached per scope, and invalidated on any service change.
+        cache_key = caching.service_statistics_key(scope)
+        data = cache.get(cache_key)
+        caching.count_cache_access('service-statistics', hit=data is not None)
+
+        if data is None:
+            # The counters that belong to this scope.
+            counters = models.ServiceStatusCounter.objects \
+                .filter(scope=scope, count__gt=0) \
+                .values_list('service_status', 'count')
+            data = dict(counters)
+            cache.set(cache_key, data, settings.SERVICE_STATISTICS_CACHE_TIMEOUT)
+
         return Response(
             data=data,
             status=status.HTTP_200_OK
         )
 
 
+class ServiceThroughputViewSet(ViewSet):
+    """
+    Providing the service throughput trends for the staff dashboard.
+    It's served from the daily rollups (see the rollup_service_throughput command).
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    # The default and the maximum number of days in a range.
+    DEFAULT_RANGE = 30
+    MAX_RANGE = 366
+
+    def list(self, request: HttpRequest, format=None) -> Response:
+        """
+        Process the get request.
+        Query parameters: start and end dates (YYYY-MM-DD), period (day or week).
+        """
+        period = request.query_params.get('period', 'day')
+        if period not in ('day', 'week'):
+            raise api_exceptions.InvalidRequestException(
+                'The period must be either day or week.')
+
+        try:
+            end = date.fromisoformat(request.query_params['end']) \
+                if 'end' in request.query_params else timezone.localdate()
+            start = date.fromisoformat(request.query_params['start']) \
+                if 'start' in request.query_params \
+                else end - timedelta(days=self.DEFAULT_RANGE - 1)
+        except ValueError as e:
+            raise api_exceptions.InvalidRequestException(str(e))
+
+        if start > end or (end - start).days >= self.MAX_RANGE:
+            raise api_exceptions.InvalidRequestException(
+                f'The range must be between 1 and {self.MAX_RANGE} days.')
+
+        return Response(
+            data=rollups.get_service_throughput(start, end, period),
+            status=status.HTTP_200_OK
+        )
+
+
 class CustomerViewSet(
+        SparseFieldsViewMixin,
+        PhoneAvailabilityMixin,
         mixins.RetrieveModelMixin,
         mixins.ListModelMixin,
         mixins.CreateModelMixin,
@@ -67,37 +123,49 @@ class CustomerViewSet(
     """
     An API endpoint for managing customers.
     """
-    filter_backends = [SearchFilter]
+    filter_backends = [FullTextSearchFilter]
     http_method_names = ['get', 'head', 'options', 'post', 'patch']
     pagination_class = pagination.DefaultPagination
     permission_classes = [DjangoModelFullPermissions]
     queryset = models.Customer.objects.select_related('user') \
         .order_by('pk') \
         .all()
+    # The search document is built from these fields (see build_search_document).
     search_fields = ['user__first_name',
                      'user__last_name', 'user__username', 'user__email', 'phone']
 
+    # The phone_lookup action limits.
+    PHONE_LOOKUP_MIN_DIGITS = 3
+    PHONE_LOOKUP_LIMIT = 10
+
     def get_serializer_class(self):
         if self.action == "partial_update":
             return serializers.CustomerUpdateSerializer
         return serializers.CustomerSerializer
 
-    @action(['post'], detail=False)
-    def phone_availability(self, request, *args, **kwargs):
-        phone = request.data.get('phone')
-        available = True
-        if phone:
-            available = not models.Customer.objects.filter(
-                phone=phone).exists()
-        else:
-            # Field cannot be empty.
-            available = False
-        if available:
-            return Response(status=status.HTTP_200_OK)
-        return Response({'phone': 'This phone number cannot be used.'}, status=status.HTTP_400_BAD_REQUEST)
+    @action(['get'], detail=False)
+    def phone_lookup(self, request, *args, **kwargs):
+        """
+        The customers whose phone numbers start with the given digits, for the typeahead inputs.
+        The prefix is normalized like the stored phones, so '+98912' and '0912' are the same.
+        """
+        prefix = utils.normalize_phone(request.query_params.get('phone', ''))
+        if len(prefix) < self.PHONE_LOOKUP_MIN_DIGITS:
+            raise api_exceptions.InvalidRequestException(
+                f'The phone must have at least {self.PHONE_LOOKUP_MIN_DIGITS} digits.')
+
+        matches = models.Customer.objects \
+            .filter(phone_normalized__startswith=prefix) \
+            .order_by('phone_normalized') \
+            .values('id', 'phone', first_name=F('user__first_name'),
+                    last_name=F('user__last_name'))[:self.PHONE_LOOKUP_LIMIT]
+
+        return Response(list(matches), status=status.HTTP_200_OK)
 
 
 class RepairManViewSet(
+        SparseFieldsViewMixin,
+        PhoneAvailabilityMixin,
         mixins.RetrieveModelMixin,
         mixins.ListModelMixin,
         mixins.CreateModelMixin,
@@ -106,13 +174,14 @@ class RepairManViewSet(
     """
     An API endpoint for managing repairmen.
     """
-    filter_backends = [SearchFilter]
+    filter_backends = [FullTextSearchFilter]
     http_method_names = ['get', 'head', 'options', 'post', 'patch']
     pagination_class = pagination.DefaultPagination
     permission_classes = [DjangoModelFullPermissions]
     queryset = models.RepairMan.objects.select_related('user') \
         .order_by('pk') \
         .all()
+    # The search document is built from these fields (see build_search_document).
     search_fields = ['user__first_name',
                      'user__last_name', 'user__username', 'user__email', 'phone']
 
@@ -121,23 +190,11 @@ class RepairManViewSet(
             return serializers.RepairManUpdateSerializer
         return serializers.RepairManSerializer
 
-    @action(['post'], detail=False)
-    def phone_availability(self, request, *args, **kwargs):
-        phone = request.data.get('phone')
-        available = True
-        if phone:
-            available = not models.RepairMan.objects.filter(
-                phone=phone).exists()
-        else:
-            available = False
-        if available:
-            return Response(status=status.HTTP_200_OK)
-        return Response({'phone': 'This phone number cannot be used.'}, status=status.HTTP_400_BAD_REQUEST)
-
 
-class CategoryViewSet(ModelViewSet):
+class CategoryViewSet(VersionedResponseCacheMixin, ModelViewSet):
     """
     An API endpoint for managing categories.
+    The list and retrieve responses are cached until a category changes.
     """
     filter_backends = [SearchFilter]
     pagination_class = pagination.DefaultPagination
@@ -148,7 +205,7 @@ class CategoryViewSet(ModelViewSet):
 
     def destroy(self, request, *args, **kwargs):
         # Check if there's an association between a service item and this category object.
-        if models.ServiceItem.objects.filter(category_id=kwargs['pk']).count() > 0:
+        if models.Category.objects.filter(pk=kwargs['pk'], item_count__gt=0).exists():
             return Response(
                 {
                     'error': 'This category is associated with one or more items and it cannot be deleted.'
@@ -158,9 +215,10 @@ class CategoryViewSet(ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
 
-class ManufacturerViewSet(ModelViewSet):
+class ManufacturerViewSet(VersionedResponseCacheMixin, ModelViewSet):
     """
     An API endpoint for managing manufacturers.
+    The list and retrieve responses are cached until a manufacturer changes.
     """
     filter_backends = [SearchFilter]
     pagination_class = pagination.DefaultPagination
@@ -171,7 +229,7 @@ class ManufacturerViewSet(ModelViewSet):
 
     def destroy(self, request, *args, **kwargs):
         # Check if there's an association between a service item and this manufacturer object.
-        if models.ServiceItem.objects.filter(manufacturer_id=kwargs['pk']).count() > 0:
+        if models.Manufacturer.objects.filter(pk=kwargs['pk'], item_count__gt=0).exists():
             return Response(
                 {
                     'error': 'This manufacturer is associated with one or more items and it cannot be deleted.'
@@ -181,9 +239,11 @@ class ManufacturerViewSet(ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
 
-class ServiceViewSet(ModelViewSet):
+class ServiceViewSet(ConditionalGetMixin, SparseFieldsViewMixin, ModelViewSet):
     """
     An API endpoint for managing services.
+    The rendered fields can be picked with ?fields= and the nested relations with ?expand=.
+    The unchanged lists and services are answered with 304 responses (see ConditionalGetMixin).
     """
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     # TODO: Priority less than, greater than filtering.
@@ -192,6 +252,24 @@ class ServiceViewSet(ModelViewSet):
     http_method_names = ['get', 'head', 'options', 'post', 'patch', 'delete']
     pagination_class = pagination.DefaultPagination
     ordering_fields = ['id', 'priority', 'last_update', 'placed_at']
+    # The nested customers and assignees are rendered too.
+    conditional_cache_versions = [
+        models.Customer._meta.label_lower, models.RepairMan._meta.label_lower]
+
+    # The most services a single bulk_status request may update.
+    BULK_MAX_SERVICES = 100
+
+    @property
+    def paginator(self):
+        """
+        The page number pagination by default, or the keyset pagination with ?pagination=cursor.
+        """
+        if not hasattr(self, '_paginator'):
+            if self.request.query_params.get('pagination') == 'cursor':
+                self._paginator = pagination.KeysetCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
 
     def get_permissions(self):
         if self.request.method in ['POST', 'PATCH', 'DELETE']:
@@ -223,11 +301,10 @@ class ServiceViewSet(ModelViewSet):
 
         # About the extra queries when updating/creating a service:
         # It happens when assigning a service to multiple repairmen.
-        # The DRF tries to validate all the given IDs where each validation is -
-        # relevant to an extra select query on the RepairMan database table.
-        # Once everything is validated, it'll execute another extra query to -
-        # update service assignees.
-        # The job gets done by calling the .set() method on a query set.
+        # All the given IDs are validated by a single select query on the RepairMan
+        # database table (see BulkPrimaryKeyRelatedField).
+        # Once everything is validated, only the added and the removed assignments
+        # are written (see Service.update_assignees), nothing at all when they're unchanged.
 
         return queryset
 
@@ -245,8 +322,75 @@ class ServiceViewSet(ModelViewSet):
             return serializers.UpdateServiceSerializer
         return serializers.ListServiceSerializer
 
+    @action(['patch'], detail=False)
+    def bulk_status(self, request, *args, **kwargs):
+        """
+        Transition a list of services to a status at once, e.g. {"ids": [1, 2], "service_status": "C"}
+        The services which already have the status are left untouched.
+        """
+        service_status = request.data.get('service_status')
+        if service_status not in dict(models.Service.SERVICE_STATUS_CHOICES):
+            raise api_exceptions.InvalidRequestException('Invalid service status.')
+
+        ids = request.data.get('ids')
+        if not isinstance(ids, list) or not ids \
+                or not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in ids):
+            raise api_exceptions.InvalidRequestException('The ids must be a list of integers.')
+        if len(ids) > self.BULK_MAX_SERVICES:
+            raise api_exceptions.InvalidRequestException(
+                f'At most {self.BULK_MAX_SERVICES} services can be updated at once.')
+
+        missing = set(ids) - set(
+            self.get_queryset().filter(pk__in=ids).values_list('pk', flat=True))
+        if missing:
+            return Response(
+                {'error': f'The services {sorted(missing)} were not found.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        services = models.Service.bulk_transition(ids, service_status)
+        return Response(
+            {'updated': [service.pk for service in services]},
+            status=status.HTTP_200_OK
+        )
+
+    @action(['patch'], detail=True)
+    def add_assignees(self, request, *args, **kwargs):
+        """
+        Assign the service to more repairmen, e.g. {"assigned_to": [3]}
+        """
+        return self.change_assignees(request, add=True)
+
+    @action(['patch'], detail=True)
+    def remove_assignees(self, request, *args, **kwargs):
+        """
+        Unassign the service from some repairmen, e.g. {"assigned_to": [3]}
+        """
+        return self.change_assignees(request, add=False)
+
+    def change_assignees(self, request, add: bool) -> Response:
+        service = self.get_object()
+        serializer = serializers.ServiceAssigneesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        repairman_ids = [repairman.pk for repairman in serializer.validated_data['assigned_to']]
+
+        with transaction.atomic():
+            if add:
+                changed = service.add_assignees(repairman_ids)
+            else:
+                changed = service.remove_assignees(repairman_ids)
+            if changed:
+                models.Service.objects.filter(pk=service.pk).update(last_update=timezone.now())
+
+        assigned_to = models.Service.assigned_to.through.objects \
+            .filter(service_id=service.pk) \
+            .order_by('repairman_id') \
+            .values_list('repairman_id', flat=True)
+        return Response({'assigned_to': list(assigned_to)}, status=status.HTTP_200_OK)
+
     def destroy(self, request, *args, **kwargs):
-        if models.ServiceItem.objects.filter(service_id=kwargs['pk']).count() > 0:
+        # The item counters are maintained by the ServiceItem signal receivers.
+        if models.Service.objects.filter(pk=kwargs['pk'], item_count__gt=0).exists():
             return Response(
                 {
                     'error': 'This service is associated with one or more items and it cannot be deleted.'
@@ -257,7 +401,7 @@ class ServiceViewSet(ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
 
-class ServiceItemViewSet(ModelViewSet):
+class ServiceItemViewSet(NestedParentMixin, ModelViewSet):
     """
     An API endpoint for managing service items.
     """
@@ -265,6 +409,13 @@ class ServiceItemViewSet(ModelViewSet):
     # TODO: Customer access.
     pagination_class = pagination.DefaultPagination
     permission_classes = [DjangoModelFullPermissions]
+    parent_model = models.Service
+    parent_lookup_kwarg = 'service_pk'
+    parent_field = 'service'
+    parent_not_found_message = 'Service not found.'
+
+    # The most items a single bulk request may create or update.
+    BULK_MAX_ITEMS = 100
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -273,28 +424,68 @@ class ServiceItemViewSet(ModelViewSet):
             return serializers.UpdateServiceItemSerializer
         return serializers.ServiceItemSerializer
 
+    def get_parent_queryset(self):
+        queryset = models.Service.objects.all()
+        # Only the customer's services.
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(customer__user_id=self.request.user.id)
+        return queryset
+
     def get_serializer_context(self):
         return {'service_id': self.kwargs['service_pk']}
 
-    def get_queryset(self):
+    def create(self, request, *args, **kwargs):
+        # A list of items is created at once.
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+
+        # The bulk path bypasses NestedParentMixin.create, the service is checked here.
+        self.check_parent()
+        serializer = self.get_serializer(
+            data=request.data, many=True, max_length=self.BULK_MAX_ITEMS)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(['patch'], detail=False)
+    def bulk_update(self, request, *args, **kwargs):
+        """
+        Partially update a list of items, e.g. [{"id": 1, "quantity": 2}, {"id": 2, "notes": ""}]
+        """
+        if not isinstance(request.data, list) \
+                or not all(isinstance(item, dict) for item in request.data):
+            raise api_exceptions.InvalidRequestException('A list of items is expected.')
+        if len(request.data) > self.BULK_MAX_ITEMS:
+            raise api_exceptions.InvalidRequestException(
+                f'At most {self.BULK_MAX_ITEMS} items can be updated at once.')
+
         try:
-            service_id = int(self.kwargs['service_pk'])
-        except ValueError as e:
-            raise api_exceptions.InvalidRequestException(str(e))
+            data = [{**item, 'id': int(item['id'])} for item in request.data]
+        except (KeyError, TypeError, ValueError):
+            raise api_exceptions.InvalidRequestException('Every item must have an integer id.')
+        ids = [item['id'] for item in data]
+        if len(set(ids)) != len(ids):
+            raise api_exceptions.InvalidRequestException('The item ids must be unique.')
+
+        # Only the items of this service can be updated.
+        instances = self.get_queryset().in_bulk(ids)
+        missing = sorted(set(ids) - set(instances))
+        if missing:
+            return Response(
+                {'error': f'The items {missing} were not found in this service.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
 
-        # If the parent resource (here: Service object) does not exists,
-        # Instead of getting a 404 HTTP response, it'll return an empty list with a 200 HTTP response.
-        # Turns out to be an issue with the drf nested routers:
-        # https://github.com/alanjds/drf-nested-routers/issues/216
-        # My workaround however, led to two extra sql queries. So I'm not going to use it for now!
-        # service_object = get_object_or_404(Service, pk=service_id)
-        # queryset = service_object.items.all() \
-        #     .select_related('manufacturer') \
-        #     .select_related('category')
-
-        queryset = models.ServiceItem.objects \
-            .filter(service_id=service_id) \
-            .select_related('manufacturer') \
-            .select_related('category')
+        serializer = self.get_serializer(instances, data=data, many=True, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    def get_queryset(self):
+        # The parent service is checked within the item queries (see NestedParentMixin),
+        # so a missing service is a 404 response instead of an empty list.
+        # The manufacturers and the categories are read from the reference tables, not joined.
+        queryset = self.filter_by_parent(models.ServiceItem.objects) \
+            .order_by('pk')
 
         return queryset
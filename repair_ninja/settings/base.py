@@ -76,6 +76,48 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# Use a shared cache (e.g. django.core.cache.backends.redis.RedisCache)
+# in production, the local memory cache is private to each worker process.
+# The production settings refuse to start with a process-local cache (see prod.py).
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'REPAIR_NINJA_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('REPAIR_NINJA_CACHE_LOCATION', ''),
+    }
+}
+
+# Seconds the service statistics are cached for, in case an invalidation is missed.
+SERVICE_STATISTICS_CACHE_TIMEOUT = int(
+    os.environ.get('REPAIR_NINJA_SERVICE_STATISTICS_CACHE_TIMEOUT', 30))
+
+# The default count of the paginated lists: exact, cached, estimated or false (omitted).
+# Requests may pick another one with the count query parameter.
+PAGINATION_COUNT_MODE = os.environ.get('REPAIR_NINJA_PAGINATION_COUNT_MODE', 'exact')
+
+# Seconds the cached counts of the paginated lists are kept for.
+PAGINATION_COUNT_CACHE_TIMEOUT = int(
+    os.environ.get('REPAIR_NINJA_PAGINATION_COUNT_CACHE_TIMEOUT', 30))
+
+# innodb_ft_min_token_size, the shorter search terms can't use the FULLTEXT indexes.
+SEARCH_FULLTEXT_MIN_TOKEN_SIZE = int(
+    os.environ.get('REPAIR_NINJA_SEARCH_FULLTEXT_MIN_TOKEN_SIZE', 3))
+
+# The most phones a single phone_availability request may check.
+PHONE_AVAILABILITY_MAX_PHONES = int(
+    os.environ.get('REPAIR_NINJA_PHONE_AVAILABILITY_MAX_PHONES', 500))
+
+# Seconds the existence of the parent objects of the nested routes is cached for.
+NESTED_PARENT_CACHE_TIMEOUT = int(
+    os.environ.get('REPAIR_NINJA_NESTED_PARENT_CACHE_TIMEOUT', 300))
+
+# Seconds the cached category and manufacturer responses are kept for, in case an invalidation is missed.
+RESPONSE_CACHE_TIMEOUT = int(
+    os.environ.get('REPAIR_NINJA_RESPONSE_CACHE_TIMEOUT', 3600))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -170,3 +212,53 @@ CORS_ALLOWED_ORIGINS = os.environ.get('REPAIR_NINJA_CORS_ALLOWED_ORIGINS', '').s
 SMS_ENABLED = bool(int(os.environ.get('REPAIR_NINJA_SMS_ENABLED', 0)))
 SMS_API_KEY = os.environ.get('REPAIR_NINJA_SMS_API_KEY')
 SMS_LINE_NUMBER = os.environ.get('REPAIR_NINJA_SMS_LINE_NUMBER', 0)
+
+# SMS.ir HTTP transport settings.
+SMS_HTTP_POOL_SIZE = int(os.environ.get('REPAIR_NINJA_SMS_HTTP_POOL_SIZE', 10))
+SMS_HTTP_TIMEOUT = float(os.environ.get('REPAIR_NINJA_SMS_HTTP_TIMEOUT', 15))
+SMS_HTTP_MAX_RETRIES = int(os.environ.get('REPAIR_NINJA_SMS_HTTP_MAX_RETRIES', 2))
+# Seconds, the upper bound of the jittered backoff is doubled on every retry.
+SMS_HTTP_RETRY_BACKOFF = float(os.environ.get('REPAIR_NINJA_SMS_HTTP_RETRY_BACKOFF', 0.5))
+SMS_HTTP_MAX_RETRY_BACKOFF = float(os.environ.get('REPAIR_NINJA_SMS_HTTP_MAX_RETRY_BACKOFF', 10))
+# Consecutive failed calls before short-circuiting and seconds before the next trial call.
+SMS_CIRCUIT_BREAKER_THRESHOLD = int(os.environ.get('REPAIR_NINJA_SMS_CIRCUIT_BREAKER_THRESHOLD', 5))
+SMS_CIRCUIT_BREAKER_RESET_TIMEOUT = float(
+    os.environ.get('REPAIR_NINJA_SMS_CIRCUIT_BREAKER_RESET_TIMEOUT', 60))
+
+# SMS outbox worker settings (see the send_sms_outbox management command).
+SMS_OUTBOX_BATCH_SIZE = int(os.environ.get('REPAIR_NINJA_SMS_OUTBOX_BATCH_SIZE', 50))
+SMS_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('REPAIR_NINJA_SMS_OUTBOX_MAX_ATTEMPTS', 5))
+# Seconds, doubled on every failed attempt up to the maximum delay.
+SMS_OUTBOX_RETRY_DELAY = int(os.environ.get('REPAIR_NINJA_SMS_OUTBOX_RETRY_DELAY', 30))
+SMS_OUTBOX_MAX_RETRY_DELAY = int(os.environ.get('REPAIR_NINJA_SMS_OUTBOX_MAX_RETRY_DELAY', 3600))
+# Seconds a claimed message is hidden from the other workers.
+SMS_OUTBOX_LEASE_TIME = int(os.environ.get('REPAIR_NINJA_SMS_OUTBOX_LEASE_TIME', 300))
+SMS_OUTBOX_POLL_INTERVAL = float(os.environ.get('REPAIR_NINJA_SMS_OUTBOX_POLL_INTERVAL', 5))
+# Seconds a service notification is held back, so the quick status changes send one message.
+SMS_OUTBOX_COALESCE_WINDOW = int(os.environ.get('REPAIR_NINJA_SMS_OUTBOX_COALESCE_WINDOW', 60))
+
+# OTP email sender settings (see the send_otp_emails management command).
+OTP_EMAIL_BATCH_SIZE = int(os.environ.get('REPAIR_NINJA_OTP_EMAIL_BATCH_SIZE', 50))
+OTP_EMAIL_MAX_ATTEMPTS = int(os.environ.get('REPAIR_NINJA_OTP_EMAIL_MAX_ATTEMPTS', 3))
+# Seconds, doubled on every failed attempt.
+OTP_EMAIL_RETRY_DELAY = int(os.environ.get('REPAIR_NINJA_OTP_EMAIL_RETRY_DELAY', 5))
+# Seconds a claimed email is hidden from the other senders.
+OTP_EMAIL_LEASE_TIME = int(os.environ.get('REPAIR_NINJA_OTP_EMAIL_LEASE_TIME', 120))
+OTP_EMAIL_POLL_INTERVAL = float(os.environ.get('REPAIR_NINJA_OTP_EMAIL_POLL_INTERVAL', 1))
+
+# OTP settings.
+# Use otp.backends.CacheOTPBackend to keep the OTPs in the cache instead of the database.
+OTP_STORAGE_BACKEND = os.environ.get(
+    'REPAIR_NINJA_OTP_STORAGE_BACKEND', 'otp.backends.DatabaseOTPBackend')
+OTP_CACHE_ALIAS = os.environ.get('REPAIR_NINJA_OTP_CACHE_ALIAS', 'default')
+# Seconds an OTP stays valid.
+OTP_LIFETIME = int(os.environ.get('REPAIR_NINJA_OTP_LIFETIME', 120))
+# Wrong guesses before an OTP is dropped.
+OTP_MAX_ATTEMPTS = int(os.environ.get('REPAIR_NINJA_OTP_MAX_ATTEMPTS', 5))
+
+# Expired OTPs reaper settings (see the remove_expired_otps management command).
+OTP_REAPER_BATCH_SIZE = int(os.environ.get('REPAIR_NINJA_OTP_REAPER_BATCH_SIZE', 1000))
+# Seconds to sleep between the delete batches.
+OTP_REAPER_PAUSE = float(os.environ.get('REPAIR_NINJA_OTP_REAPER_PAUSE', 0.1))
+# Seconds between the runs of remove_expired_otps --loop.
+OTP_REAPER_INTERVAL = float(os.environ.get('REPAIR_NINJA_OTP_REAPER_INTERVAL', 300))
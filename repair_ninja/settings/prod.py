@@ -6,7 +6,9 @@ See https://docs.djangoproject.com/en/5.0/howto/deployment/checklist/
 
 import os
 
-from repair_ninja.settings.base import REST_FRAMEWORK
+from django.core.exceptions import ImproperlyConfigured
+
+from repair_ninja.settings.base import CACHES, REST_FRAMEWORK
 
 SECRET_KEY = os.environ.get('REPAIR_NINJA_DJANGO_SECRET_KEY')
 
@@ -18,6 +20,14 @@ ALLOWED_HOSTS = os.environ.get('REPAIR_NINJA_ALLOWED_HOSTS', '').split(',')
 
 CSRF_TRUSTED_ORIGINS = os.environ.get('REPAIR_NINJA_CSRF_TRUSTED_ORIGINS', '').split(',')
 
+# The cache versions invalidate the caches of every gunicorn worker and the worker commands
+# (e.g. the category and manufacturer reference tables), they must live in a shared cache.
+if CACHES['default']['BACKEND'] in (
+        'django.core.cache.backends.locmem.LocMemCache',
+        'django.core.cache.backends.dummy.DummyCache'):
+    raise ImproperlyConfigured(
+        'REPAIR_NINJA_CACHE_BACKEND must be a shared cache (e.g. Redis) in production.')
+
 REST_FRAMEWORK.update(
     {
         'DEFAULT_RENDERER_CLASSES': (
@@ -0,0 +1,14 @@
+from django.contrib import admin
+
+from . import models
+
+
+@admin.register(models.OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ['id', 'phone', 'status', 'attempts',
+                    'created_at', 'next_attempt_at', 'sent_at']
+    list_filter = ['status']
+    list_per_page = 20
+    ordering = ['-id']
+    readonly_fields = ['created_at', 'sent_at', 'last_error']
+    search_fields = ['phone']
@@ -0,0 +1,53 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+
+from sms_message.outbox import process_outbox
+from sms_message.utils import transport
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Deliver the pending SMS messages stored in the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.SMS_OUTBOX_BATCH_SIZE,
+            help='Maximum number of messages to deliver per batch.')
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep draining the outbox instead of exiting once it is empty.')
+        parser.add_argument(
+            '--interval', type=float, default=settings.SMS_OUTBOX_POLL_INTERVAL,
+            help='Seconds to sleep between the polls when the outbox is empty.')
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                result = process_outbox(batch_size=options['batch_size'])
+            except DatabaseError:
+                if not options['loop']:
+                    raise
+                # A failed poll is retried on the next interval.
+                logger.exception('Processing the SMS outbox failed.')
+            else:
+                if sum(result.values()):
+                    self.stdout.write(self.style.SUCCESS(
+                        f"Sent {result['sent']}, retrying {result['retried']}, "
+                        f"failed {result['failed']} SMS messages."))
+                    if options['verbosity'] > 1:
+                        self.stdout.write(f"SMS transport stats: {transport.stats()}")
+                    # Keep going while there might be more due messages.
+                    continue
+
+            if not options['loop']:
+                break
+
+            # The connection may be broken, the next poll opens a new one.
+            close_old_connections()
+            time.sleep(options['interval'])
@@ -0,0 +1,40 @@
+from django.db import models
+from django.utils import timezone
+
+
+class OutboxMessage(models.Model):
+    """
+    Represents an SMS message waiting to be delivered by the outbox worker.
+    """
+    STATUS_PENDING = 'P'
+    STATUS_SENT = 'S'
+    STATUS_FAILED = 'F'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    phone = models.CharField(max_length=255)
+    message = models.TextField()
+    # Pending messages of a phone with the same key replace each other during the coalesce window.
+    coalesce_key = models.CharField(max_length=255, blank=True, default='')
+    status = models.CharField(
+        max_length=1, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"SMS to {self.phone} ({self.get_status_display()})"
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            # The worker only ever looks for the due pending messages.
+            models.Index(fields=['status', 'next_attempt_at']),
+            models.Index(fields=['phone', 'coalesce_key']),
+        ]
@@ -0,0 +1,174 @@
+"""
+A durable outbox for the SMS messages.
+
+The messages are stored in the database alongside the change that produced them,
+and a separate worker process (see the send_sms_outbox management command)
+delivers them, so the API never waits on the SMS provider.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from sms_message.models import OutboxMessage
+from sms_message.utils import SmsMessage, transport
+
+
+def enqueue_sms(number: str, message: str, coalesce_key: str = '') -> OutboxMessage:
+    """
+    Store a message in the outbox.
+    Call it inside the transaction that produces the message, so both are committed together.
+
+    Messages with a coalesce key are held back for the coalesce window. Until then,
+    a newer message for the same phone and key replaces the held text instead of
+    queuing another message, so only the latest state gets delivered.
+    """
+    window = settings.SMS_OUTBOX_COALESCE_WINDOW
+    if not coalesce_key or not window:
+        return OutboxMessage.objects.create(phone=number, message=message)
+
+    now = timezone.now()
+    pending = OutboxMessage.objects.filter(
+        phone=number,
+        coalesce_key=coalesce_key,
+        status=OutboxMessage.STATUS_PENDING,
+        attempts=0,
+        # Only the messages which are still held back, the older ones may be in flight.
+        created_at__gt=now - timedelta(seconds=window),
+    )
+    if pending.update(message=message):
+        return pending.first()
+
+    return OutboxMessage.objects.create(
+        phone=number,
+        message=message,
+        coalesce_key=coalesce_key,
+        next_attempt_at=now + timedelta(seconds=window),
+    )
+
+
+def enqueue_sms_batch(messages: list) -> None:
+    """
+    Store a list of (number, message, coalesce_key) messages in the outbox,
+    with a constant number of queries instead of an enqueue_sms() per message.
+    """
+    window = settings.SMS_OUTBOX_COALESCE_WINDOW
+    now = timezone.now()
+    new_messages = []
+    held = {}
+
+    if window:
+        # The held back messages that the coalescing ones replace (see enqueue_sms).
+        keys = {coalesce_key for _, _, coalesce_key in messages if coalesce_key}
+        pending = OutboxMessage.objects.filter(
+            coalesce_key__in=keys,
+            status=OutboxMessage.STATUS_PENDING,
+            attempts=0,
+            created_at__gt=now - timedelta(seconds=window),
+        )
+        held = {(outbox_message.phone, outbox_message.coalesce_key): outbox_message
+                for outbox_message in pending}
+
+    replaced = []
+    for number, message, coalesce_key in messages:
+        if not coalesce_key or not window:
+            new_messages.append(OutboxMessage(phone=number, message=message))
+        elif (number, coalesce_key) in held:
+            held[(number, coalesce_key)].message = message
+            replaced.append(held[(number, coalesce_key)])
+        else:
+            new_messages.append(OutboxMessage(
+                phone=number,
+                message=message,
+                coalesce_key=coalesce_key,
+                next_attempt_at=now + timedelta(seconds=window),
+            ))
+
+    if replaced:
+        OutboxMessage.objects.bulk_update(replaced, ['message'])
+    if new_messages:
+        OutboxMessage.objects.bulk_create(new_messages)
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """
+    Exponential backoff delay for the given number of failed attempts.
+    """
+    delay = settings.SMS_OUTBOX_RETRY_DELAY * (2 ** max(attempts - 1, 0))
+    return timedelta(seconds=min(delay, settings.SMS_OUTBOX_MAX_RETRY_DELAY))
+
+
+def claim_batch(batch_size: int) -> list:
+    """
+    Claim a batch of the due pending messages.
+    The claimed rows are leased by pushing their next attempt forward,
+    so other workers skip them while this worker is talking to the provider.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutboxMessage.objects
+            .select_for_update(skip_locked=True)
+            .filter(
+                status=OutboxMessage.STATUS_PENDING,
+                next_attempt_at__lte=now,
+            )
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        OutboxMessage.objects.filter(pk__in=[m.pk for m in batch]).update(
+            next_attempt_at=now + timedelta(seconds=settings.SMS_OUTBOX_LEASE_TIME)
+        )
+    return batch
+
+
+def process_outbox(batch_size: int = None, sms_instance: SmsMessage = None) -> dict:
+    """
+    Deliver a single batch of the due pending messages.
+    Returns the number of the sent, retried and failed messages.
+    """
+    batch = claim_batch(batch_size or settings.SMS_OUTBOX_BATCH_SIZE)
+    sms_instance = sms_instance or SmsMessage()
+    result = {'sent': 0, 'retried': 0, 'failed': 0}
+
+    # The messages sharing the same text are delivered with a single bulk request.
+    groups = {}
+    for outbox_message in batch:
+        groups.setdefault(outbox_message.message, []).append(outbox_message)
+
+    for message, outbox_messages in groups.items():
+        if transport.circuit_breaker.is_open:
+            # The provider is down, give the rest of the batch back without using up its attempts.
+            for outbox_message in outbox_messages:
+                outbox_message.next_attempt_at = timezone.now() \
+                    + timedelta(seconds=settings.SMS_CIRCUIT_BREAKER_RESET_TIMEOUT)
+            result['retried'] += len(outbox_messages)
+            continue
+
+        numbers = list(dict.fromkeys(m.phone for m in outbox_messages))
+        response = sms_instance.send_bulk_sms(numbers=numbers, message=message)
+
+        for outbox_message in outbox_messages:
+            outbox_message.attempts += 1
+
+            if response.ok:
+                outbox_message.status = OutboxMessage.STATUS_SENT
+                outbox_message.sent_at = timezone.now()
+                outbox_message.last_error = ''
+                result['sent'] += 1
+            elif outbox_message.attempts >= settings.SMS_OUTBOX_MAX_ATTEMPTS:
+                outbox_message.status = OutboxMessage.STATUS_FAILED
+                outbox_message.last_error = f'HTTP {response.status_code}'
+                result['failed'] += 1
+            else:
+                outbox_message.next_attempt_at = timezone.now() \
+                    + retry_delay(outbox_message.attempts)
+                outbox_message.last_error = f'HTTP {response.status_code}'
+                result['retried'] += 1
+
+    OutboxMessage.objects.bulk_update(
+        batch,
+        ['status', 'attempts', 'last_error', 'next_attempt_at', 'sent_at']
+    )
+
+    return result
@@ -3,33 +3,58 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver
 
 from repair_core.models import Service
-from sms_message.utils import SmsMessage
+from repair_core.signals import service_statuses_changed
+from sms_message.outbox import enqueue_sms, enqueue_sms_batch
 
-# FIXME: Use pre_save signal to prevent duplication messages.
 
-
-@receiver(post_save, sender=Service)
-def notify_customer(sender, instance, created, **kwargs):
-    """Notify customer on service creation or update."""
-    # Do nothing when sms messages are not enabled or the API key is empty.
-    if not settings.SMS_ENABLED or not settings.SMS_API_KEY:
-        return
-
-    customer = instance.customer
+def build_status_message(service: Service) -> str:
+    """Build the notification text for the current status of a service."""
+    customer = service.customer
     customer_fullname = str(customer).strip() or 'Customer'
-    customer_phone = customer.phone
     message = f"Dear {customer_fullname},\n"
-    if instance.service_status == Service.SERVICE_RECEIVED:
+    if service.service_status == Service.SERVICE_RECEIVED:
         message += (
             'Your service has been received.\n'
-            f'The estimated delivery date is: {instance.estimation_delivery}.'
+            f'The estimated delivery date is: {service.estimation_delivery}.'
         )
-    elif instance.service_status == Service.SERVICE_IN_PROGRESS:
+    elif service.service_status == Service.SERVICE_IN_PROGRESS:
         message += "Your service is currently being processed."
-    elif instance.service_status == Service.SERVICE_COMPLETED:
+    elif service.service_status == Service.SERVICE_COMPLETED:
         message += "Your service has been completed and is now ready to receive."
-    elif instance.service_status == Service.SERVICE_DELIVERED:
+    elif service.service_status == Service.SERVICE_DELIVERED:
         message += "Thanks for choosing us! We hope to see you again."
+    return message
+
+
+@receiver(post_save, sender=Service)
+def notify_customer(sender, instance, created, **kwargs):
+    """Notify customer on service creation or status transition."""
+    # Do nothing when sms messages are not enabled or the API key is empty.
+    if not settings.SMS_ENABLED or not settings.SMS_API_KEY:
+        return
+
+    # Updates that don't touch the status (e.g. priority or description) are not notified.
+    if not created and \
+            instance.get_loaded_value('service_status') == instance.service_status:
+        return
+
+    # The message is stored in the outbox within the service's transaction.
+    # It will be delivered later by the send_sms_outbox worker.
+    # Quick consecutive transitions of a service are coalesced into its latest state.
+    enqueue_sms(
+        number=instance.customer.phone,
+        message=build_status_message(instance),
+        coalesce_key=f"service-{instance.pk}",
+    )
+
+
+@receiver(service_statuses_changed, sender=Service)
+def notify_customers(sender, services, **kwargs):
+    """Notify the customers of a bulk status transition at once."""
+    if not settings.SMS_ENABLED or not settings.SMS_API_KEY:
+        return
 
-    sms_instance = SmsMessage()
-    sms_instance.send_sms(number=customer_phone, message=message)
+    enqueue_sms_batch([
+        (service.customer.phone, build_status_message(service), f"service-{service.pk}")
+        for service in services
+    ])
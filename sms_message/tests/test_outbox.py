@@ -0,0 +1,181 @@
+from datetime import date
+from io import StringIO
+from unittest import mock
+
+import pytest
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.utils import timezone
+
+from repair_core.models import Customer, Service
+from sms_message.models import OutboxMessage
+from sms_message.outbox import process_outbox
+
+
+User = get_user_model()
+
+
+@pytest.fixture(name='enable_sms')
+def fixture_enable_sms(settings):
+    """Enable the SMS notifications."""
+    settings.SMS_ENABLED = True
+    settings.SMS_API_KEY = 'test-api-key'
+    # Deliver the messages right away unless a test asks for coalescing.
+    settings.SMS_OUTBOX_COALESCE_WINDOW = 0
+    return settings
+
+
+@pytest.fixture(name='create_service_instance')
+def fixture_create_service_instance():
+    """Create and return a Service instance."""
+    def _create_service_instance(phone='09120000000'):
+        user = User.objects.create_user(
+            username=f'customer-{phone}',
+            first_name='John',
+            last_name='Doe',
+        )
+        customer = Customer.objects.create(user=user, phone=phone)
+        return Service.objects.create(
+            customer=customer,
+            estimation_delivery=date(2024, 1, 1)
+        )
+    return _create_service_instance
+
+
+def fake_sms_instance(status_code):
+    """Return a mocked SmsMessage which answers every send with the given status code."""
+    sms_instance = mock.Mock()
+    sms_instance.send_bulk_sms.return_value = mock.Mock(
+        ok=status_code < 400, status_code=status_code)
+    return sms_instance
+
+
+@pytest.mark.django_db
+class TestSmsOutbox:
+    """Test the SMS outbox and its delivery worker."""
+
+    def test_if_service_creation_enqueues_a_message(self, enable_sms, create_service_instance):
+        """Test if creating a service stores a pending message in the outbox."""
+        create_service_instance()
+
+        outbox_message = OutboxMessage.objects.get()
+
+        assert outbox_message.status == OutboxMessage.STATUS_PENDING
+        assert outbox_message.phone == '09120000000'
+        assert 'Your service has been received.' in outbox_message.message
+
+    def test_if_disabled_sms_does_not_enqueue(self, create_service_instance):
+        """Test if nothing is stored while the SMS messages are disabled."""
+        create_service_instance()
+
+        assert not OutboxMessage.objects.exists()
+
+    def test_if_successful_delivery_marks_message_as_sent(self, enable_sms,
+                                                          create_service_instance):
+        """Test if a delivered message is marked as sent."""
+        create_service_instance()
+
+        result = process_outbox(sms_instance=fake_sms_instance(200))
+        outbox_message = OutboxMessage.objects.get()
+
+        assert result == {'sent': 1, 'retried': 0, 'failed': 0}
+        assert outbox_message.status == OutboxMessage.STATUS_SENT
+        assert outbox_message.attempts == 1
+        assert outbox_message.sent_at is not None
+
+    def test_if_failed_delivery_is_retried_with_backoff(self, enable_sms,
+                                                        create_service_instance):
+        """Test if a failed message is scheduled for another attempt."""
+        create_service_instance()
+
+        result = process_outbox(sms_instance=fake_sms_instance(503))
+        outbox_message = OutboxMessage.objects.get()
+
+        assert result == {'sent': 0, 'retried': 1, 'failed': 0}
+        assert outbox_message.status == OutboxMessage.STATUS_PENDING
+        assert outbox_message.next_attempt_at > timezone.now()
+        assert outbox_message.last_error == 'HTTP 503'
+        # The message is not due yet, so the next batch skips it.
+        assert sum(process_outbox(sms_instance=fake_sms_instance(200)).values()) == 0
+
+    def test_if_message_fails_after_max_attempts(self, enable_sms, create_service_instance):
+        """Test if a message is marked as failed once it runs out of attempts."""
+        enable_sms.SMS_OUTBOX_MAX_ATTEMPTS = 1
+        create_service_instance()
+
+        result = process_outbox(sms_instance=fake_sms_instance(503))
+
+        assert result == {'sent': 0, 'retried': 0, 'failed': 1}
+        assert OutboxMessage.objects.get().status == OutboxMessage.STATUS_FAILED
+
+    def test_if_loop_logs_failed_polls(self, caplog):
+        """Test if a failed poll is logged and the loop goes on."""
+        command = 'sms_message.management.commands.send_sms_outbox'
+
+        with mock.patch(f'{command}.process_outbox', side_effect=DatabaseError('gone')), \
+                mock.patch(f'{command}.time.sleep', side_effect=[None, InterruptedError]):
+            with pytest.raises(InterruptedError):
+                call_command('send_sms_outbox', '--loop', '--interval=0', stdout=StringIO())
+
+        failures = [record for record in caplog.records if record.exc_info]
+        assert len(failures) == 2
+        assert 'gone' in str(failures[0].exc_info[1])
+
+
+@pytest.mark.django_db
+class TestServiceNotifications:
+    """Test which service changes are notified and how they're coalesced."""
+
+    def test_if_non_status_update_is_not_notified(self, enable_sms, create_service_instance):
+        """Test if updating the priority of a service does not enqueue a message."""
+        service = create_service_instance()
+
+        service = Service.objects.get(pk=service.pk)
+        service.priority = 1
+        service.save()
+
+        assert OutboxMessage.objects.count() == 1
+
+    def test_if_status_transition_is_notified(self, enable_sms, create_service_instance):
+        """Test if changing the status of a service enqueues a message."""
+        service = create_service_instance()
+
+        service = Service.objects.get(pk=service.pk)
+        service.service_status = Service.SERVICE_IN_PROGRESS
+        service.save()
+        # Saving again without a transition must not notify twice.
+        service.save()
+
+        assert OutboxMessage.objects.count() == 2
+        assert 'currently being processed' in OutboxMessage.objects.last().message
+
+    def test_if_quick_transitions_are_coalesced(self, enable_sms, create_service_instance):
+        """Test if the transitions within the window only send the latest state."""
+        enable_sms.SMS_OUTBOX_COALESCE_WINDOW = 60
+        service = create_service_instance()
+
+        for service_status in [Service.SERVICE_IN_PROGRESS, Service.SERVICE_COMPLETED]:
+            service.service_status = service_status
+            service.save()
+
+        outbox_message = OutboxMessage.objects.get()
+
+        assert 'has been completed' in outbox_message.message
+        # The message is held back until the window is over.
+        assert outbox_message.next_attempt_at > timezone.now()
+
+    def test_if_same_text_is_sent_in_bulk(self, enable_sms):
+        """Test if the messages sharing a text are delivered with a single request."""
+        OutboxMessage.objects.create(phone='09120000001', message='Hello')
+        OutboxMessage.objects.create(phone='09120000002', message='Hello')
+        OutboxMessage.objects.create(phone='09120000003', message='Bye')
+        sms_instance = fake_sms_instance(200)
+
+        result = process_outbox(sms_instance=sms_instance)
+
+        assert result['sent'] == 3
+        assert sms_instance.send_bulk_sms.call_count == 2
+        sms_instance.send_bulk_sms.assert_any_call(
+            numbers=['09120000001', '09120000002'], message='Hello')
@@ -0,0 +1,116 @@
+import json
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from sms_message.utils import SmsMessage, transport
+
+
+class FakeSmsProviderHandler(BaseHTTPRequestHandler):
+    """Answers every request with the next status code of the server's queue."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.received.append(json.loads(body))
+        self.server.connections.add(self.client_address)
+        status_code = self.server.status_codes.pop(0) if self.server.status_codes else 200
+        payload = b'{}'
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(name='fake_provider')
+def fixture_fake_provider():
+    """Run a fake SMS provider on a local port."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeSmsProviderHandler)
+    server.received = []
+    server.connections = set()
+    server.status_codes = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(name='sms_instance')
+def fixture_sms_instance(fake_provider, settings):
+    """An SmsMessage pointed at the fake provider, with a fresh transport state."""
+    settings.SMS_HTTP_RETRY_BACKOFF = 0
+    circuit_breaker = transport.circuit_breaker
+    thresholds = (circuit_breaker.failure_threshold, circuit_breaker.reset_timeout)
+    transport.close()
+    transport.reset_stats()
+    transport.circuit_breaker.reset()
+    host, port = fake_provider.server_address
+    yield SmsMessage(api_key='test-api-key', linenumber=1000,
+                     api_endpoint=f'http://{host}:{port}')
+    transport.close()
+    circuit_breaker.failure_threshold, circuit_breaker.reset_timeout = thresholds
+    circuit_breaker.reset()
+
+
+class TestSmsTransport:
+    """Test the pooled, retrying SMS transport."""
+
+    def test_if_connection_is_reused(self, fake_provider, sms_instance):
+        """Test if consecutive messages share a single keep-alive connection."""
+        sms_instance.send_sms('09120000000', 'First')
+        sms_instance.send_sms('09120000000', 'Second')
+
+        assert len(fake_provider.received) == 2
+        assert fake_provider.received[1]['MessageText'] == 'Second'
+        assert len(fake_provider.connections) == 1
+
+    def test_if_retryable_errors_are_retried(self, fake_provider, sms_instance):
+        """Test if a 503 answer is retried until the provider accepts the message."""
+        fake_provider.status_codes = [503, 200]
+
+        response = sms_instance.send_sms('09120000000', 'Hello')
+        stats = transport.stats()
+
+        assert response.status_code == 200
+        assert stats['retries'] == 1
+        assert stats['attempts'] == 2
+        assert stats['successes'] == 1
+        assert stats['average_latency'] is not None
+
+    def test_if_circuit_opens_after_consecutive_failures(self, fake_provider, settings,
+                                                         sms_instance):
+        """Test if the calls are short-circuited while the provider is down."""
+        settings.SMS_HTTP_MAX_RETRIES = 0
+        transport.circuit_breaker.failure_threshold = 2
+        fake_provider.status_codes = [503, 503]
+
+        sms_instance.send_sms('09120000000', 'Hello')
+        sms_instance.send_sms('09120000000', 'Hello')
+        response = sms_instance.send_sms('09120000000', 'Hello')
+        stats = transport.stats()
+
+        assert response.status_code == 503
+        assert len(fake_provider.received) == 2
+        assert stats['short_circuited'] == 1
+        assert stats['circuit_state'] == 'open'
+
+    def test_if_half_open_circuit_closes_on_success(self, fake_provider, settings,
+                                                    sms_instance):
+        """Test if a successful trial call closes the circuit again."""
+        settings.SMS_HTTP_MAX_RETRIES = 0
+        transport.circuit_breaker.failure_threshold = 1
+        transport.circuit_breaker.reset_timeout = 0
+        fake_provider.status_codes = [503]
+
+        sms_instance.send_sms('09120000000', 'Hello')
+        response = sms_instance.send_sms('09120000000', 'Hello')
+
+        assert response.status_code == 200
+        assert transport.stats()['circuit_state'] == 'closed'
@@ -1,10 +1,15 @@
 """
 Inspired from https://github.com/IPeCompany/SmsPanelV2.Python.
 """
+import random
+import threading
+import time
+
 from typing import List
 from django.conf import settings
+from requests.adapters import HTTPAdapter
 from requests.models import Response
-from requests.exceptions import ConnectTimeout, HTTPError, ReadTimeout, Timeout
+from requests.exceptions import RequestException
 
 import requests
 
@@ -12,6 +17,205 @@ import requests
 LINE_NUMBER = settings.SMS_LINE_NUMBER or None
 API_KEY = settings.SMS_API_KEY
 
+# The status codes worth another try, everything else is returned as is.
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class CircuitBreaker():
+    """
+    Stops calling the SMS provider after too many consecutive failures.
+
+    The circuit opens once the failure threshold is reached and short-circuits
+    every call until the reset timeout passes. Then a single trial call is let through,
+    which closes the circuit on success or opens it again on failure.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_progress = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at < self.reset_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == self.OPEN
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_progress:
+                self._trial_in_progress = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_progress = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_progress or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_progress = False
+
+    def reset(self) -> None:
+        self.record_success()
+
+
+class SmsTransport():
+    """
+    The HTTP transport shared by every SmsMessage instance in this process.
+
+    It keeps a pooled keep-alive session to the provider, retries the failed calls
+    with a jittered exponential backoff and guards the provider with a circuit breaker.
+    """
+
+    def __init__(self) -> None:
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=settings.SMS_CIRCUIT_BREAKER_THRESHOLD,
+            reset_timeout=settings.SMS_CIRCUIT_BREAKER_RESET_TIMEOUT,
+        )
+        self._session = None
+        self._lock = threading.Lock()
+        self._counters = {}
+        self.reset_stats()
+
+    @property
+    def session(self) -> requests.Session:
+        with self._lock:
+            if self._session is None:
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=settings.SMS_HTTP_POOL_SIZE,
+                    max_retries=0,
+                )
+                session = requests.Session()
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._session = session
+            return self._session
+
+    def close(self) -> None:
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._counters = {
+                'requests': 0,
+                'attempts': 0,
+                'successes': 0,
+                'failures': 0,
+                'retries': 0,
+                'short_circuited': 0,
+                'total_latency': 0.0,
+                'last_latency': None,
+            }
+
+    def _count(self, name: str, value=1) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    def stats(self) -> dict:
+        """
+        A snapshot of the transport counters and the circuit breaker state.
+        Latencies are in seconds.
+        """
+        with self._lock:
+            stats = dict(self._counters)
+        stats['average_latency'] = (
+            stats['total_latency'] / stats['attempts'] if stats['attempts'] else None
+        )
+        stats['circuit_state'] = self.circuit_breaker.state
+        return stats
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Full-jitter exponential backoff in seconds for the given retry attempt.
+        """
+        ceiling = settings.SMS_HTTP_RETRY_BACKOFF * (2 ** attempt)
+        return random.uniform(0, min(ceiling, settings.SMS_HTTP_MAX_RETRY_BACKOFF))
+
+    def post(self, url: str, headers: dict, data: dict) -> Response:
+        """
+        Sends a post request, retrying the connection errors and the retryable status codes.
+        """
+        if not self.circuit_breaker.allow_request():
+            self._count('short_circuited')
+            return fake_response(requests.Request('POST', url).prepare())
+
+        self._count('requests')
+        max_retries = settings.SMS_HTTP_MAX_RETRIES
+        response = None
+
+        for attempt in range(max_retries + 1):
+            if attempt:
+                self._count('retries')
+                time.sleep(self.backoff(attempt - 1))
+
+            self._count('attempts')
+            started_at = time.monotonic()
+            try:
+                response = self.session.post(
+                    url, headers=headers, json=data, timeout=settings.SMS_HTTP_TIMEOUT)
+            except RequestException as e:
+                # TODO: Logging.
+                response = fake_response(e.request or requests.Request('POST', url).prepare())
+            finally:
+                latency = time.monotonic() - started_at
+                self._count('total_latency', latency)
+                with self._lock:
+                    self._counters['last_latency'] = latency
+
+            if response.status_code not in RETRYABLE_STATUS_CODES:
+                break
+
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            self._count('failures')
+            self.circuit_breaker.record_failure()
+        else:
+            self._count('successes')
+            # The provider did answer, even if it rejected the request.
+            self.circuit_breaker.record_success()
+
+        return response
+
+
+def fake_response(request) -> Response:
+    """
+    Generates a fake response object with a status code of 503.
+    """
+    response = requests.models.Response()
+    response.status_code = 503
+    response.request = request
+    response.url = request.url
+
+    return response
+
+
+# The process-wide transport, so every message reuses the same connection pool.
+transport = SmsTransport()
+
 
 class SmsMessage():
     """
@@ -22,8 +226,10 @@ class SmsMessage():
     """
     API_ENDPOINT = 'https://api.sms.ir'
 
-    def __init__(self, api_key: str = API_KEY, linenumber: int = LINE_NUMBER) -> None:
+    def __init__(self, api_key: str = API_KEY, linenumber: int = LINE_NUMBER,
+                 api_endpoint: str = None) -> None:
         self._linenumber = linenumber
+        self._api_endpoint = api_endpoint or self.API_ENDPOINT
         self._headers = {
             'X-API-KEY': api_key,
             'ACCEPT': 'application/json',
@@ -44,7 +250,7 @@ class SmsMessage():
         """
         Sends a message to multiple phone numbers.
         """
-        url = f"{self.API_ENDPOINT}/v1/send/bulk/"
+        url = f"{self._api_endpoint}/v1/send/bulk/"
 
         data = {
             'lineNumber': linenumber or self._linenumber,
@@ -58,19 +264,10 @@ class SmsMessage():
         """
         Sends a post request to a url with the given data.
         """
-        try:
-            return requests.post(url, headers=self._headers, json=data, timeout=15)
-        except (ConnectionError, ConnectTimeout, HTTPError, ReadTimeout, Timeout) as e:
-            # TODO: Logging.
-            return self.fake_response(e.request)
+        return transport.post(url, headers=self._headers, data=data)
 
     def fake_response(self, request):
         """
         Generates a fake response object with a status code of 503.
         """
-        response = requests.models.Response()
-        response.status_code = 503
-        response.request = request
-        response.url = request.url
-
-        return response
+        return fake_response(request)